@@ -1,22 +1,88 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import Empleado, Producto
-from .models import Promocion
+from .models import Promocion, Pedido, LineaPedido
+from .pagination import PaginadorConteoEstimado
+from .search import filtro_busqueda
+from .signals import notificar_cambio_menu
+
+
+def actualizar_en_bloque(modeladmin, request, queryset, actualizar):
+    # Un único UPDATE sobre la selección (también con "seleccionar todos") y aviso del cambio
+    Modelo = queryset.model
+    with transaction.atomic():
+        ids = list(queryset.values_list('id', flat=True))
+        total = actualizar(queryset)
+        if ids:
+            notificar_cambio_menu(Modelo, ids)
+    modeladmin.message_user(request, f'Registros actualizados: {total}.')
 
 @admin.register(Empleado)
 class EmpleadoAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'tipo_empleado')
-    search_fields = ('username', 'email')
+    # Por prefijo y sin distinguir mayúsculas, por usuario o por correo
+    search_fields = ('username__istartswith', 'email__istartswith')
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'categoria', 'precio', 'estado')
     list_filter = ('categoria', 'estado')
     search_fields = ('nombre', 'descripcion')
+    # Orden por clave primaria también en el autocompletado
+    ordering = ('-id',)
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
+    actions = ['alternar_estado']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Índice de texto completo (FTS5 / tsvector) en vez de LIKE sobre nombre y descripción;
+        # también lo usa el autocompletado de productos en promociones
+        if not search_term:
+            return queryset, False
+        return queryset.filter(filtro_busqueda(search_term)), False
+
+    @admin.action(description='Alternar disponible / fuera de stock')
+    def alternar_estado(self, request, queryset):
+        actualizar_en_bloque(self, request, queryset, lambda productos: productos.alternar_estado())
 
 # Añade esto al final de admin.py
 @admin.register(Promocion)
 class PromocionAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'descuento', 'fecha_inicio', 'fecha_fin', 'estado', 'esta_activa')
+    list_display = ('nombre', 'descuento', 'fecha_inicio', 'fecha_fin', 'estado', 'activa')
     list_filter = ('estado', 'fecha_inicio', 'fecha_fin')
     search_fields = ('nombre', 'descripcion')
-    filter_horizontal = ('productos',)
\ No newline at end of file
+    # Autocompletado: el formulario no carga todos los productos
+    autocomplete_fields = ('productos',)
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
+    actions = ['activar', 'desactivar']
+
+    def get_queryset(self, request):
+        # ``activa`` calculada en la consulta del listado, no con esta_activa() por fila
+        return super().get_queryset(request).con_activa()
+
+    @admin.display(boolean=True, ordering='activa', description='Activa')
+    def activa(self, obj):
+        return obj.activa
+
+    @admin.action(description='Activar promociones seleccionadas')
+    def activar(self, request, queryset):
+        actualizar_en_bloque(self, request, queryset, lambda promociones: promociones.update(estado='ACTIVA'))
+
+    @admin.action(description='Desactivar promociones seleccionadas')
+    def desactivar(self, request, queryset):
+        actualizar_en_bloque(self, request, queryset, lambda promociones: promociones.update(estado='INACTIVA'))
+
+class LineaPedidoInline(admin.TabularInline):
+    model = LineaPedido
+    extra = 0
+    raw_id_fields = ('producto',)
+
+@admin.register(Pedido)
+class PedidoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'mesa', 'mesero', 'estado', 'total', 'creado_en')
+    list_filter = ('estado',)
+    list_select_related = ('mesero',)
+    inlines = [LineaPedidoInline]
@@ -0,0 +1,76 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed
+from rest_framework.request import Request
+
+from .cache import adatos_en_cache
+from .models import Producto
+from .pagination import CursorPaginacionOpcional
+from .renderers import renderer_para
+from .serializers import ProductoSerializer, PromocionSerializer
+from .views import promociones_con_productos
+
+# Lecturas nativas para ASGI: ORM asíncrono y sin hilo de trabajo por petición.
+# La respuesta es la misma que la de las vistas DRF; como solo son lecturas
+# públicas no pasan por autenticación ni permisos.
+
+FILTROS_PRODUCTO = ('categoria', 'estado')
+
+
+def respuesta_negociada(request, datos):
+    renderer = renderer_para(request.headers.get('Accept'))
+    response = HttpResponse(renderer.render(datos), content_type=renderer.media_type)
+    response['Vary'] = 'Accept'
+    return response
+
+
+async def listar(queryset, request, serializar):
+    """Lista completa o, con ``cursor``/``page_size``, la misma página que la API síncrona."""
+    paginator = CursorPaginacionOpcional()
+    drf_request = Request(request)
+    if not paginator.solicitada(drf_request):
+        return serializar([instancia async for instancia in queryset])
+    # CursorPagination consulta con el ORM síncrono; es lo mismo que hace el ORM asíncrono por dentro
+    pagina = await sync_to_async(paginator.paginate_queryset)(queryset, drf_request)
+    return paginator.get_paginated_response(serializar(pagina)).data
+
+
+async def productos(request, pk=None):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    async def construir():
+        if pk is not None:
+            try:
+                producto = await Producto.objects.aget(pk=pk)
+            except Producto.DoesNotExist:
+                raise Http404
+            return ProductoSerializer(producto).data
+        queryset = Producto.objects.order_by('id')
+        for campo in FILTROS_PRODUCTO:
+            valor = request.GET.get(campo)
+            if valor:
+                queryset = queryset.filter(**{campo: valor})
+        return await listar(queryset, request, lambda lista: ProductoSerializer(lista, many=True).data)
+
+    return respuesta_negociada(request, await adatos_en_cache('async:productos', request, construir))
+
+
+async def promociones(request, pk=None):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    # Con la petición en el contexto las URLs de las imágenes son absolutas, como en la API síncrona
+    contexto = {'request': request}
+
+    async def construir():
+        queryset = promociones_con_productos()
+        if pk is not None:
+            lista = [promocion async for promocion in queryset.filter(pk=pk)]
+            if not lista:
+                raise Http404
+            return PromocionSerializer(lista[0], context=contexto).data
+        return await listar(
+            queryset, request, lambda lista: PromocionSerializer(lista, many=True, context=contexto).data
+        )
+
+    return respuesta_negociada(request, await adatos_en_cache('async:promociones', request, construir))
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+from .models import Empleado
+
+
+def clave_empleado(empleado_id):
+    return f'empleado:{empleado_id}'
+
+
+def obtener_empleado(empleado_id):
+    """Empleado completo con caché de TTL corto (EMPLEADO_CACHE_TIMEOUT, 0 la desactiva)."""
+    timeout = getattr(settings, 'EMPLEADO_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return Empleado.objects.get(pk=empleado_id)
+    clave = clave_empleado(empleado_id)
+    empleado = cache.get(clave)
+    if empleado is None:
+        empleado = Empleado.objects.get(pk=empleado_id)
+        cache.set(clave, empleado, timeout)
+    return empleado
+
+
+class EmpleadoToken(TokenUser):
+    # Usuario ligero construido con los claims del token: no consulta la BD
+
+    @cached_property
+    def tipo_empleado(self):
+        # Tokens emitidos antes de incluir el claim: se recurre al modelo
+        return self.token.get('tipo_empleado') or self.empleado.tipo_empleado
+
+    def is_admin(self):
+        return self.tipo_empleado == 'ADM'
+
+    @cached_property
+    def empleado(self):
+        return obtener_empleado(self.id)
+
+
+class EmpleadoTokenAuthentication(JWTStatelessUserAuthentication):
+    """Autenticación JWT sin consulta por petición.
+
+    ``request.user`` es un ``EmpleadoToken``; las vistas que necesiten el
+    modelo completo pueden usar ``request.user.empleado``.
+    """
@@ -0,0 +1,147 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router
+from django.utils import timezone
+
+PREFIJO = 'bench-'
+AVISO_DATOS = f'Usar sobre una base de datos de pruebas: crea y borra filas con prefijo "{PREFIJO}".'
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def resumen(latencias, duracion, errores=0, consultas=None):
+    """Métricas de una ronda: latencias en segundos, duracion total en segundos."""
+    datos = {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'rps': round(len(latencias) / duracion, 1) if duracion else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'max_ms': round(max(latencias, default=0) * 1000, 2),
+    }
+    if consultas is not None:
+        datos['consultas_por_peticion'] = round(sum(consultas) / len(consultas), 2) if consultas else 0.0
+    return datos
+
+
+def ejecutar_concurrente(funcion, total, concurrencia):
+    """Llama ``funcion(i)`` ``total`` veces repartidas en ``concurrencia`` hilos.
+
+    ``funcion`` devuelve True si la petición fue correcta. Las conexiones de
+    cada hilo las gestiona Django al final de cada petición (CONN_MAX_AGE).
+    """
+    def medir(i):
+        inicio = time.perf_counter()
+        try:
+            correcto = funcion(i)
+        except Exception:
+            correcto = False
+        return time.perf_counter() - inicio, correcto
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(medir, range(total)))
+    duracion = time.perf_counter() - inicio
+
+    latencias = [latencia for latencia, _ in resultados]
+    errores = sum(1 for _, correcto in resultados if not correcto)
+    return latencias, duracion, errores
+
+
+def sembrar_catalogo(productos, promociones=0, productos_por_promocion=5, semilla=1):
+    """Crea un catálogo sintético reproducible con prefijo ``PREFIJO``.
+
+    Usa bulk_create, así que no dispara señales; devuelve los ids creados.
+    """
+    from .models import Producto, Promocion
+
+    aleatorio = random.Random(semilla)
+    categorias = [valor for valor, _ in Producto.CATEGORIA_CHOICES]
+    hoy = timezone.now().date()
+
+    Producto.objects.bulk_create((
+        Producto(
+            nombre=f'{PREFIJO}{i}', categoria=aleatorio.choice(categorias), descripcion='Benchmark',
+            precio=f'{aleatorio.randint(100, 5000) / 100:.2f}',
+            estado='DISPONIBLE' if aleatorio.random() < 0.9 else 'FUERA_STOCK',
+        )
+        for i in range(productos)
+    ), batch_size=1000)
+    ids_productos = list(Producto.objects.filter(nombre__startswith=PREFIJO).values_list('id', flat=True))
+
+    Promocion.objects.bulk_create((
+        Promocion(
+            nombre=f'{PREFIJO}{i}', descripcion='Benchmark', descuento=f'{aleatorio.randint(5, 50)}.00',
+            fecha_inicio=hoy - timedelta(days=aleatorio.randint(0, 30)),
+            fecha_fin=hoy + timedelta(days=aleatorio.randint(-10, 30)),
+            estado='ACTIVA' if aleatorio.random() < 0.8 else 'INACTIVA',
+        )
+        for i in range(promociones)
+    ), batch_size=1000)
+    ids_promociones = list(Promocion.objects.filter(nombre__startswith=PREFIJO).values_list('id', flat=True))
+
+    Enlace = Promocion.productos.through
+    por_promocion = min(productos_por_promocion, len(ids_productos))
+    Enlace.objects.bulk_create((
+        Enlace(promocion_id=promocion_id, producto_id=producto_id)
+        for promocion_id in ids_promociones
+        for producto_id in aleatorio.sample(ids_productos, por_promocion)
+    ), batch_size=1000)
+    return ids_productos, ids_promociones
+
+
+def limpiar_catalogo(ids_productos, ultimo_evento=None):
+    """Borra el catálogo sembrado y lo que generaron las peticiones medidas."""
+    from .cache import invalidar_menu
+    from .models import EventoMenu, PrecioVigente, Producto, Promocion
+    from .search import indexar_productos
+
+    # Borrado directo en SQL: Model.delete() enviaría una señal por fila
+    alias = router.db_for_write(Producto)
+    productos = Producto.objects.filter(nombre__startswith=PREFIJO)
+    promociones = Promocion.objects.filter(nombre__startswith=PREFIJO)
+    Promocion.productos.through.objects.filter(promocion__in=promociones)._raw_delete(alias)
+    PrecioVigente.objects.filter(producto__in=productos)._raw_delete(alias)
+    promociones._raw_delete(alias)
+    productos._raw_delete(alias)
+    indexar_productos(ids_productos)
+    if ultimo_evento is not None:
+        EventoMenu.objects.filter(id__gt=ultimo_evento).delete()
+    invalidar_menu()
+
+
+class ComandoBenchmark(BaseCommand):
+    """Base de los comandos ``benchmark_*``.
+
+    Añaden ``AVISO_DATOS`` a su ``help``, llaman a ``comprobar_base_libre()``
+    antes de sembrar y terminan con ``escribir_informe()``.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', help='Fichero JSON donde guardar los resultados.')
+
+    def comprobar_base_libre(self):
+        from .models import Producto
+
+        # limpiar_catalogo() borra todo lo que empiece por PREFIJO, también lo previo
+        if Producto.objects.filter(nombre__startswith=PREFIJO).exists():
+            raise CommandError(f'Ya existen productos "{PREFIJO}"; bórrelos o use otra base de datos.')
+
+    def escribir_informe(self, informe, ruta=None):
+        salida = json.dumps(informe, indent=2, ensure_ascii=False)
+        if ruta:
+            with open(ruta, 'w', encoding='utf-8') as fichero:
+                fichero.write(salida)
+        self.stdout.write(salida)
@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .routers import lee_de_replica
+
+CLAVE_VERSION = 'menu:version'
+
+
+def obtener_cache():
+    return caches[getattr(settings, 'MENU_CACHE_ALIAS', 'default')]
+
+
+def version_menu():
+    cache = obtener_cache()
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Semilla basada en el reloj: si la clave se pierde nunca se reutiliza una versión vieja
+        cache.add(CLAVE_VERSION, time.time_ns(), timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def invalidar_menu():
+    cache = obtener_cache()
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, time.time_ns(), timeout=None)
+
+
+def url_de(request):
+    # Con esquema y host: los payloads llevan URLs absolutas de imágenes y un
+    # Host distinto no debe servir (ni envenenar) las entradas de otro
+    return f'{request.scheme}://{request.get_host()}{request.get_full_path()}'
+
+
+def clave_menu(prefijo, request):
+    return f'menu:{version_menu()}:{prefijo}:{url_de(request)}'
+
+
+def datos_en_cache(prefijo, request, construir):
+    """Devuelve el payload serializado de una lectura del menú.
+
+    La clave incluye la versión del menú, por lo que cualquier cambio en
+    productos o promociones deja obsoletas todas las entradas anteriores.
+    Solo se guarda lo leído de la primaria: una réplica con retraso dejaría
+    datos previos al cambio bajo la versión nueva.
+    """
+    cache = obtener_cache()
+    clave = clave_menu(prefijo, request)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = construir()
+        if not lee_de_replica():
+            cache.set(clave, datos, getattr(settings, 'MENU_CACHE_TIMEOUT', 300))
+    return datos
+
+
+async def aversion_menu():
+    cache = obtener_cache()
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        await cache.aadd(CLAVE_VERSION, time.time_ns(), timeout=None)
+        version = await cache.aget(CLAVE_VERSION)
+    return version
+
+
+async def adatos_en_cache(prefijo, request, construir):
+    # Variante asíncrona de datos_en_cache; ``construir`` es una corrutina
+    cache = obtener_cache()
+    clave = f'menu:{await aversion_menu()}:{prefijo}:{url_de(request)}'
+    datos = await cache.aget(clave)
+    if datos is None:
+        datos = await construir()
+        await cache.aset(clave, datos, getattr(settings, 'MENU_CACHE_TIMEOUT', 300))
+    return datos
@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# nombre: (ancho, alto, recortar)
+RENDICIONES = {
+    'thumbnail': (160, 160, True),
+    'card': (640, 400, False),
+    'full': (1600, 1600, False),
+}
+CARPETA = 'promociones'
+
+_pool = None
+
+
+def obtener_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGENES_WORKERS', 2), thread_name_prefix='imagenes'
+        )
+    return _pool
+
+
+def calcular_hash(archivo):
+    sha = hashlib.sha256()
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(64 * 1024), b''):
+        sha.update(bloque)
+    archivo.seek(0)
+    return sha.hexdigest()
+
+
+def ruta_original(hash_imagen, nombre_subido):
+    extension = os.path.splitext(nombre_subido)[1].lower() or '.img'
+    return f'{CARPETA}/originales/{hash_imagen}{extension}'
+
+
+def ruta_rendicion(hash_imagen, rendicion):
+    return f'{CARPETA}/{hash_imagen[:2]}/{hash_imagen}/{rendicion}.webp'
+
+
+def guardar_original(archivo):
+    """Guarda la subida bajo su sha256; una imagen idéntica ya subida no se vuelve a escribir."""
+    hash_imagen = calcular_hash(archivo)
+    nombre = ruta_original(hash_imagen, archivo.name)
+    if not default_storage.exists(nombre):
+        nombre = default_storage.save(nombre, archivo)
+    return hash_imagen, nombre
+
+
+def generar_rendiciones(hash_imagen, nombre_original):
+    with default_storage.open(nombre_original, 'rb') as archivo:
+        imagen = ImageOps.exif_transpose(Image.open(archivo))
+        imagen.load()
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() else 'RGB')
+
+    for rendicion, (ancho, alto, recortar) in RENDICIONES.items():
+        if recortar:
+            copia = ImageOps.fit(imagen, (ancho, alto), Image.LANCZOS)
+        else:
+            copia = imagen.copy()
+            copia.thumbnail((ancho, alto), Image.LANCZOS)
+        salida = BytesIO()
+        copia.save(salida, 'WEBP', quality=getattr(settings, 'IMAGENES_CALIDAD', 80), method=4)
+        nombre = ruta_rendicion(hash_imagen, rendicion)
+        if default_storage.exists(nombre):
+            default_storage.delete(nombre)
+        default_storage.save(nombre, ContentFile(salida.getvalue()))
+
+
+def procesar_imagen(hash_imagen, nombre_original):
+    from .models import Promocion
+    from .signals import notificar_cambio_menu
+
+    try:
+        generar_rendiciones(hash_imagen, nombre_original)
+        promociones = Promocion.objects.filter(imagen_hash=hash_imagen)
+        ids = list(promociones.values_list('id', flat=True))
+        promociones.update(imagen_lista=True)
+        notificar_cambio_menu(Promocion, ids)
+    except Exception:
+        logger.exception('No se pudieron generar las versiones de la imagen %s', hash_imagen)
+    finally:
+        if not getattr(settings, 'IMAGENES_SINCRONO', False):
+            connection.close()
+
+
+def encolar_imagen(hash_imagen, nombre_original):
+    # Fuera del ciclo de la petición; IMAGENES_SINCRONO procesa en línea (tests, desarrollo)
+    if getattr(settings, 'IMAGENES_SINCRONO', False):
+        procesar_imagen(hash_imagen, nombre_original)
+        return None
+    return obtener_pool().submit(procesar_imagen, hash_imagen, nombre_original)
+
+
+def urls_imagen(promocion, request=None):
+    return urls_rendiciones(promocion.imagen.name, promocion.imagen_hash, promocion.imagen_lista, request)
+
+
+def urls_rendiciones(nombre, hash_imagen, lista, request=None):
+    if not nombre:
+        return None
+    if lista:
+        urls = {rendicion: default_storage.url(ruta_rendicion(hash_imagen, rendicion)) for rendicion in RENDICIONES}
+    else:
+        # Mientras se procesan, todas apuntan al original
+        urls = dict.fromkeys(RENDICIONES, default_storage.url(nombre))
+    if request is not None:
+        urls = {rendicion: request.build_absolute_uri(url) for rendicion, url in urls.items()}
+    return urls
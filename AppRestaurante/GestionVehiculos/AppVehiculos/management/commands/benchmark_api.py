@@ -0,0 +1,162 @@
+import platform
+import subprocess
+import time
+from contextlib import ExitStack
+
+import django
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from AppVehiculos.benchmarks import (
+    AVISO_DATOS, PREFIJO, ComandoBenchmark, ejecutar_concurrente, limpiar_catalogo, resumen, sembrar_catalogo,
+)
+from AppVehiculos.models import Empleado, EventoMenu
+
+CLAVE = 'bench-clave'
+ESCENARIOS = (
+    'token', 'listar_productos', 'detalle_producto', 'listar_promociones', 'detalle_promocion', 'toggle_estado',
+)
+
+
+class Command(ComandoBenchmark):
+    help = (
+        'Siembra un catálogo sintético grande (productos, promociones y sus enlaces M2M) y mide los '
+        'endpoints de token, productos, promociones y toggle de estado con la concurrencia indicada. '
+        'Informa p50/p95/p99, peticiones por segundo y consultas SQL por petición en JSON. '
+    ) + AVISO_DATOS
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=100_000)
+        parser.add_argument('--promociones', type=int, default=10_000)
+        parser.add_argument('--productos-por-promocion', type=int, default=5)
+        parser.add_argument('--peticiones', type=int, default=500, help='Peticiones por escenario y concurrencia.')
+        parser.add_argument(
+            '--concurrencia', default='8',
+            help='Hilos simultáneos; admite una lista separada por comas, p. ej. 1,8,32.',
+        )
+        parser.add_argument('--escenarios', default=','.join(ESCENARIOS), help='Subconjunto separado por comas.')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla del generador de datos.')
+        parser.add_argument('--con-cache', action='store_true', help='Mide con la caché del menú activa.')
+        parser.add_argument('--conservar', action='store_true', help='No borra los datos sembrados al terminar.')
+        super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        escenarios = [nombre.strip() for nombre in options['escenarios'].split(',') if nombre.strip()]
+        desconocidos = set(escenarios) - set(ESCENARIOS)
+        if desconocidos:
+            raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(desconocidos))}')
+        try:
+            concurrencias = [int(valor) for valor in options['concurrencia'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrencia debe ser un entero o una lista de enteros separada por comas.')
+        self.comprobar_base_libre()
+
+        ajustes = {} if options['con_cache'] else {
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        }
+        with override_settings(**ajustes):
+            ultimo_evento = EventoMenu.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            inicio = time.perf_counter()
+            datos = self.sembrar(options)
+            siembra = round(time.perf_counter() - inicio, 2)
+            self.stderr.write(f'Siembra: {len(datos["productos"])} productos, '
+                              f'{len(datos["promociones"])} promociones en {siembra}s')
+            try:
+                resultados = {
+                    str(concurrencia): {
+                        nombre: self.medir(nombre, datos, options['peticiones'], concurrencia)
+                        for nombre in escenarios
+                    }
+                    for concurrencia in concurrencias
+                }
+            finally:
+                if not options['conservar']:
+                    self.limpiar(datos, ultimo_evento)
+
+        informe = {
+            'commit': self.commit_actual(),
+            'fecha': timezone.now().isoformat(),
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'vendor': connection.vendor,
+                'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+                'cache_menu': options['con_cache'],
+            },
+            'datos': {
+                'productos': options['productos'],
+                'promociones': options['promociones'],
+                'productos_por_promocion': options['productos_por_promocion'],
+                'semilla': options['semilla'],
+                'siembra_s': siembra,
+            },
+            'peticiones': options['peticiones'],
+            'resultados': resultados,
+        }
+        self.escribir_informe(informe, options['salida'])
+
+    def sembrar(self, options):
+        admin = Empleado.objects.create_user(username=f'{PREFIJO}admin', password=CLAVE, tipo_empleado='ADM')
+        productos, promociones = sembrar_catalogo(
+            options['productos'], options['promociones'], options['productos_por_promocion'], options['semilla']
+        )
+        return {'admin': admin, 'productos': productos, 'promociones': promociones}
+
+    def limpiar(self, datos, ultimo_evento):
+        limpiar_catalogo(datos['productos'], ultimo_evento)
+        datos['admin'].delete()
+
+    def medir(self, nombre, datos, peticiones, concurrencia):
+        productos, promociones = datos['productos'], datos['promociones']
+        credenciales = {'username': datos['admin'].username, 'password': CLAVE}
+        acceso = APIClient().post('/api/auth/token/', credenciales, format='json').data['access']
+
+        def cliente():
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {acceso}')
+            return client
+
+        peticiones_por_escenario = {
+            'token': lambda i: APIClient().post('/api/auth/token/', credenciales, format='json'),
+            'listar_productos': lambda i: cliente().get('/api/productos/', {'page_size': 50}),
+            'detalle_producto': lambda i: cliente().get(f'/api/productos/{productos[i % len(productos)]}/'),
+            'listar_promociones': lambda i: cliente().get('/api/promociones/', {'page_size': 50}),
+            'detalle_promocion': lambda i: cliente().get(f'/api/promociones/{promociones[i % len(promociones)]}/'),
+            'toggle_estado': lambda i: cliente().patch(
+                f'/api/productos/{productos[i % len(productos)]}/', {'estado': 'toggle'}, format='json'
+            ),
+        }
+        hacer_peticion = peticiones_por_escenario[nombre]
+        consultas = []
+
+        def peticion(i):
+            contador = [0]
+
+            def contar(execute, sql, params, many, context):
+                contador[0] += 1
+                return execute(sql, params, many, context)
+
+            # La conexión es propia de cada hilo, así que el contador solo ve esta petición;
+            # se cuentan todas las bases configuradas (primaria y réplicas)
+            with ExitStack() as pila:
+                for alias in connections:
+                    pila.enter_context(connections[alias].execute_wrapper(contar))
+                correcto = hacer_peticion(i).status_code == 200
+            consultas.append(contador[0])
+            return correcto
+
+        latencias, duracion, errores = ejecutar_concurrente(peticion, peticiones, concurrencia)
+        datos_escenario = resumen(latencias, duracion, errores, consultas)
+        self.stderr.write(f'[c={concurrencia}] {nombre}: {datos_escenario}')
+        return datos_escenario
+
+    def commit_actual(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
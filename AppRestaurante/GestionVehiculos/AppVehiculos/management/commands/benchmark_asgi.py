@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from AppVehiculos.benchmarks import (
+    AVISO_DATOS, ComandoBenchmark, ejecutar_concurrente, limpiar_catalogo, resumen, sembrar_catalogo,
+)
+from AppVehiculos.models import EventoMenu
+
+RUTAS = {
+    'listar_productos': ('/api/productos/?categoria=ENTRADA', '/api/async/productos/?categoria=ENTRADA'),
+    'detalle_producto': ('/api/productos/{id}/', '/api/async/productos/{id}/'),
+    'listar_promociones': ('/api/promociones/', '/api/async/promociones/'),
+}
+
+
+class Command(ComandoBenchmark):
+    help = (
+        'Compara rendimiento y latencias de cola entre las lecturas WSGI (DRF, un hilo por '
+        'petición) y las lecturas asíncronas servidas por el manejador ASGI, en proceso. '
+    ) + AVISO_DATOS
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=500)
+        parser.add_argument('--concurrencia', type=int, default=32)
+        parser.add_argument('--productos', type=int, default=200)
+        parser.add_argument('--con-cache', action='store_true', help='Mide también la caché del menú.')
+        super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        self.comprobar_base_libre()
+        caches = None if options['con_cache'] else {
+            'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        }
+        with override_settings(**({'CACHES': caches} if caches else {})):
+            ultimo_evento = EventoMenu.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            self.ids, _ = sembrar_catalogo(options['productos'])
+            try:
+                resultados = {
+                    nombre: {
+                        'wsgi': self.medir_wsgi(sincrona, options['peticiones'], options['concurrencia']),
+                        'asgi': asyncio.run(
+                            self.medir_asgi(asincrona, options['peticiones'], options['concurrencia'])
+                        ),
+                    }
+                    for nombre, (sincrona, asincrona) in RUTAS.items()
+                }
+            finally:
+                limpiar_catalogo(self.ids, ultimo_evento)
+
+        self.escribir_informe({'concurrencia': options['concurrencia'], 'escenarios': resultados}, options['salida'])
+
+    def ruta(self, plantilla, i):
+        return plantilla.format(id=self.ids[i % len(self.ids)])
+
+    def medir_wsgi(self, plantilla, peticiones, concurrencia):
+        def peticion(i):
+            return Client().get(self.ruta(plantilla, i)).status_code == 200
+
+        latencias, duracion, errores = ejecutar_concurrente(peticion, peticiones, concurrencia)
+        return resumen(latencias, duracion, errores)
+
+    async def medir_asgi(self, plantilla, peticiones, concurrencia):
+        semaforo = asyncio.Semaphore(concurrencia)
+        client = AsyncClient()
+
+        async def peticion(i):
+            async with semaforo:
+                inicio = time.perf_counter()
+                try:
+                    correcto = (await client.get(self.ruta(plantilla, i))).status_code == 200
+                except Exception:
+                    correcto = False
+                return time.perf_counter() - inicio, correcto
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(peticion(i) for i in range(peticiones)))
+        duracion = time.perf_counter() - inicio
+        latencias = [latencia for latencia, _ in resultados]
+        return resumen(latencias, duracion, sum(1 for _, correcto in resultados if not correcto))
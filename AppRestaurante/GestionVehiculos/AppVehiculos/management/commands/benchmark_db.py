@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from AppVehiculos.benchmarks import (
+    AVISO_DATOS, PREFIJO, ComandoBenchmark, ejecutar_concurrente, limpiar_catalogo, resumen, sembrar_catalogo,
+)
+from AppVehiculos.models import Empleado, EventoMenu
+
+
+class Command(ComandoBenchmark):
+    help = (
+        'Mide los endpoints de productos contra la base de datos configurada. '
+        'Ejecutar una vez por perfil (DB_ENGINE, DB_SQLITE_TUNED, DB_POOL...) y comparar. '
+    ) + AVISO_DATOS
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=500)
+        parser.add_argument('--concurrencia', type=int, default=8)
+        parser.add_argument('--productos', type=int, default=1000, help='Productos sembrados para la prueba.')
+        super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        self.comprobar_base_libre()
+
+        # Sin caché del menú: se mide el coste real de la base de datos
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            ultimo_evento = EventoMenu.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            admin = Empleado.objects.create_user(username=f'{PREFIJO}admin', password='x', tipo_empleado='ADM')
+            ids, _ = sembrar_catalogo(options['productos'])
+            try:
+                resultados = self.medir(admin, ids, options['peticiones'], options['concurrencia'])
+            finally:
+                limpiar_catalogo(ids, ultimo_evento)
+                admin.delete()
+
+        informe = {
+            'base_de_datos': {
+                'vendor': connection.vendor,
+                'conn_max_age': connection.settings_dict.get('CONN_MAX_AGE'),
+                'opciones': {k: str(v) for k, v in connection.settings_dict.get('OPTIONS', {}).items()},
+            },
+            'concurrencia': options['concurrencia'],
+            'escenarios': resultados,
+        }
+        self.escribir_informe(informe, options['salida'])
+
+    def medir(self, admin, ids, peticiones, concurrencia):
+        def cliente():
+            client = APIClient()
+            client.force_authenticate(user=admin)
+            return client
+
+        escenarios = {
+            'listar_productos_pagina': lambda i: cliente().get('/api/productos/', {'page_size': 50}).status_code == 200,
+            'detalle_producto': lambda i: cliente().get(f'/api/productos/{ids[i % len(ids)]}/').status_code == 200,
+            'toggle_estado': lambda i: cliente().patch(
+                f'/api/productos/{ids[i % len(ids)]}/', {'estado': 'toggle'}, format='json'
+            ).status_code == 200,
+            'listar_promociones_pagina': lambda i: cliente().get('/api/promociones/', {'page_size': 50}).status_code == 200,
+        }
+        resultados = {}
+        for nombre, funcion in escenarios.items():
+            latencias, duracion, errores = ejecutar_concurrente(funcion, peticiones, concurrencia)
+            resultados[nombre] = resumen(latencias, duracion, errores)
+            self.stderr.write(f'{nombre}: {resultados[nombre]}')
+        return resultados
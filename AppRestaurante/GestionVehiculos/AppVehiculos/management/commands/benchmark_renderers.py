@@ -0,0 +1,74 @@
+import gzip
+import json
+import statistics
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from AppVehiculos.benchmarks import AVISO_DATOS, PREFIJO, ComandoBenchmark, limpiar_catalogo, sembrar_catalogo
+from AppVehiculos.models import Producto, Promocion
+from AppVehiculos.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from AppVehiculos.serializers import CAMPOS_PRODUCTO, CAMPOS_PROMOCION, productos_a_datos, promociones_a_datos
+
+
+class Command(ComandoBenchmark):
+    help = (
+        'Compara tamaño del payload y tiempo de codificación/decodificación del JSON de DRF, '
+        'el JSON con orjson y MessagePack sobre los listados de productos y promociones. '
+    ) + AVISO_DATOS
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--promociones', type=int, default=1000)
+        parser.add_argument('--repeticiones', type=int, default=9)
+        super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        self.comprobar_base_libre()
+        ids_productos, _ = sembrar_catalogo(options['productos'], options['promociones'])
+        try:
+            cargas = {
+                'productos': productos_a_datos(
+                    Producto.objects.filter(nombre__startswith=PREFIJO).order_by('id').values(*CAMPOS_PRODUCTO)
+                ),
+                'promociones': promociones_a_datos(
+                    Promocion.objects.filter(nombre__startswith=PREFIJO).order_by('id').values(*CAMPOS_PROMOCION)
+                ),
+            }
+        finally:
+            limpiar_catalogo(ids_productos)
+
+        formatos = {'json_drf': (JSONRenderer(), json.loads)}
+        if orjson is not None:
+            formatos['json_orjson'] = (ORJSONRenderer(), orjson.loads)
+        if msgpack is not None:
+            formatos['msgpack'] = (MessagePackRenderer(), msgpack.unpackb)
+
+        resultados = {
+            nombre: {
+                formato: self.medir(renderer, decodificar, datos, options['repeticiones'])
+                for formato, (renderer, decodificar) in formatos.items()
+            }
+            for nombre, datos in cargas.items()
+        }
+        self.escribir_informe(
+            {'productos': options['productos'], 'promociones': options['promociones'], 'resultados': resultados},
+            options['salida'],
+        )
+
+    def medir(self, renderer, decodificar, datos, repeticiones):
+        def mediana_ms(funcion):
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                funcion()
+                tiempos.append(time.perf_counter() - inicio)
+            return round(statistics.median(tiempos) * 1000, 2)
+
+        contenido = renderer.render(datos)
+        return {
+            'bytes': len(contenido),
+            'bytes_gzip': len(gzip.compress(contenido, 6)),
+            'codificar_ms': mediana_ms(lambda: renderer.render(datos)),
+            'decodificar_ms': mediana_ms(lambda: decodificar(contenido)),
+        }
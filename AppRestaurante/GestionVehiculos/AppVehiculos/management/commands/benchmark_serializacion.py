@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.core.management.base import CommandError
+from rest_framework.renderers import JSONRenderer
+
+from AppVehiculos.benchmarks import AVISO_DATOS, PREFIJO, ComandoBenchmark, limpiar_catalogo, sembrar_catalogo
+from AppVehiculos.models import Producto, Promocion
+from AppVehiculos.serializers import (
+    CAMPOS_PRODUCTO, CAMPOS_PROMOCION, ProductoSerializer, PromocionSerializer,
+    productos_a_datos, promociones_a_datos,
+)
+from AppVehiculos.views import promociones_con_productos
+
+
+class Command(ComandoBenchmark):
+    help = (
+        'Microbenchmark de los listados: compara ProductoSerializer/PromocionSerializer con la ruta '
+        'rápida basada en .values() (consulta + serialización + JSON) y comprueba que la salida es idéntica. '
+    ) + AVISO_DATOS
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--promociones', type=int, default=1000)
+        parser.add_argument('--repeticiones', type=int, default=7)
+        super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        self.comprobar_base_libre()
+        ids_productos, _ = sembrar_catalogo(options['productos'], options['promociones'])
+        try:
+            productos = Producto.objects.filter(nombre__startswith=PREFIJO).order_by('id')
+            promociones = Promocion.objects.filter(nombre__startswith=PREFIJO).order_by('id')
+            casos = {
+                'productos': (
+                    lambda: ProductoSerializer(productos, many=True).data,
+                    lambda: productos_a_datos(productos.values(*CAMPOS_PRODUCTO)),
+                ),
+                'promociones': (
+                    lambda: PromocionSerializer(
+                        promociones_con_productos().filter(nombre__startswith=PREFIJO), many=True
+                    ).data,
+                    lambda: promociones_a_datos(promociones.values(*CAMPOS_PROMOCION)),
+                ),
+            }
+            resultados = {
+                nombre: self.comparar(serializer, rapida, options['repeticiones'])
+                for nombre, (serializer, rapida) in casos.items()
+            }
+        finally:
+            limpiar_catalogo(ids_productos)
+
+        self.escribir_informe(
+            {'productos': options['productos'], 'promociones': options['promociones'], 'resultados': resultados},
+            options['salida'],
+        )
+
+    def comparar(self, serializer, rapida, repeticiones):
+        renderer = JSONRenderer()
+        if renderer.render(serializer()) != renderer.render(rapida()):
+            raise CommandError('La ruta rápida no produce la misma salida que el serializer.')
+
+        def medir(construir):
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                renderer.render(construir())
+                tiempos.append(time.perf_counter() - inicio)
+            return statistics.median(tiempos) * 1000
+
+        serializer_ms, rapida_ms = medir(serializer), medir(rapida)
+        return {
+            'serializer_ms': round(serializer_ms, 2),
+            'rapida_ms': round(rapida_ms, 2),
+            'aceleracion': round(serializer_ms / rapida_ms, 2) if rapida_ms else None,
+        }
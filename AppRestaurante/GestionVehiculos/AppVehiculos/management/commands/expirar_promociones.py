@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from AppVehiculos.models import Promocion
+from AppVehiculos.signals import notificar_cambio_menu
+
+
+class Command(BaseCommand):
+    help = 'Pasa a INACTIVA, en un solo UPDATE, las promociones activas cuya fecha_fin ya pasó (ejecutar a diario).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha de referencia AAAA-MM-DD (por defecto hoy).')
+        parser.add_argument(
+            '--cada', type=int, default=0,
+            help='Repetir cada N segundos (proceso en segundo plano). 0 ejecuta una sola vez.'
+        )
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            fecha = parse_date(options['fecha'])
+            if fecha is None:
+                raise CommandError('Formato de fecha inválido, use AAAA-MM-DD.')
+        while True:
+            total = self.expirar(fecha or timezone.now().date())
+            self.stdout.write(f'{total} promociones expiradas pasadas a INACTIVA')
+            if not options['cada']:
+                break
+            time.sleep(options['cada'])
+
+    def expirar(self, fecha):
+        # Un único UPDATE con las condiciones de expiradas(); RETURNING (SQLite >= 3.35 y
+        # PostgreSQL) devuelve los ids que hay que notificar sin leerlos antes
+        tabla = connection.ops.quote_name(Promocion._meta.db_table)
+        fecha_fin = Promocion._meta.get_field('fecha_fin').get_db_prep_value(fecha, connection)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {tabla} SET estado = %s WHERE estado = %s AND fecha_fin < %s RETURNING id',
+                    ['INACTIVA', 'ACTIVA', fecha_fin],
+                )
+                ids = [fila[0] for fila in cursor.fetchall()]
+            if ids:
+                # El UPDATE no dispara post_save
+                notificar_cambio_menu(Promocion, ids)
+        return len(ids)
@@ -0,0 +1,331 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from AppVehiculos.models import Producto, Promocion, lotes_de_ids
+from AppVehiculos.serializers import ProductoSerializer, PromocionSerializer
+from AppVehiculos.signals import notificar_cambio_menu
+
+FORMATOS = ('csv', 'json', 'ndjson')
+CLAVES_NATURALES = {'productos': ('nombre', 'categoria'), 'promociones': ('nombre', 'fecha_inicio')}
+MAX_ERRORES_MOSTRADOS = 50
+
+
+class PromocionImportSerializer(PromocionSerializer):
+    # Las referencias a productos se resuelven por lote en el comando, no id a id
+    productos = None
+    imagen = None
+    imagenes = None
+
+    class Meta(PromocionSerializer.Meta):
+        fields = ['id', 'nombre', 'descripcion', 'descuento', 'fecha_inicio', 'fecha_fin', 'estado']
+
+
+def filas_csv(fichero):
+    for fila in csv.DictReader(fichero):
+        if fila.get('productos') is not None:
+            fila['productos'] = [ref.strip() for ref in fila['productos'].split('|') if ref.strip()]
+        yield fila
+
+
+def filas_ndjson(fichero):
+    for linea in fichero:
+        if linea.strip():
+            yield json.loads(linea)
+
+
+def filas_json(fichero, tamano=1 << 16):
+    """Recorre una lista JSON elemento a elemento sin cargar el fichero entero."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    while not buffer.strip():
+        parte = fichero.read(tamano)
+        if not parte:
+            return
+        buffer += parte
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('El JSON debe ser una lista de objetos.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            objeto, fin = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            parte = fichero.read(tamano)
+            if not parte:
+                raise CommandError('JSON incompleto o mal formado.')
+            buffer += parte
+            continue
+        yield objeto
+        buffer = buffer[fin:]
+
+
+def errores_por_posicion(errores):
+    # Según la versión de DRF los errores de many=True llegan como lista o como dict
+    if not isinstance(errores, dict):
+        errores = dict(enumerate(errores))
+    return {posicion: error for posicion, error in errores.items() if error}
+
+
+def actualizar_por_pk(Modelo, instancias, campos):
+    # INSERT ... ON CONFLICT (id) DO UPDATE: bulk_update genera un CASE por fila y
+    # es decenas de veces más lento con lotes grandes
+    Modelo.objects.bulk_create(instancias, update_conflicts=True, unique_fields=['id'], update_fields=sorted(campos))
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa productos o promociones desde CSV, JSON o NDJSON leyendo el fichero en streaming. '
+        'Valida por lotes con los serializers de la API, resuelve las referencias promoción→producto '
+        'con una consulta por lote y escribe con INSERT masivos (ON CONFLICT para las actualizaciones). En CSV los productos de una '
+        'promoción se separan con "|" y pueden ser ids o nombres de producto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del fichero, o "-" para leer de la entrada estándar.')
+        parser.add_argument('--modelo', choices=tuple(CLAVES_NATURALES), required=True)
+        parser.add_argument('--formato', choices=FORMATOS, help='Por defecto se deduce de la extensión.')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas validadas y escritas por lote.')
+        parser.add_argument(
+            '--upsert', action='store_true',
+            help='Actualiza las filas existentes con la misma clave natural en vez de duplicarlas.',
+        )
+        parser.add_argument(
+            '--clave', help='Campos de la clave natural separados por comas '
+                            '(por defecto nombre,categoria o nombre,fecha_inicio).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Valida e informa sin escribir nada.')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or Path(options['archivo']).suffix.lstrip('.').lower()
+        if formato not in FORMATOS:
+            raise CommandError(f'Formato desconocido; use --formato ({", ".join(FORMATOS)}).')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+
+        self.modelo = options['modelo']
+        self.clave = tuple(options['clave'].split(',')) if options['clave'] else CLAVES_NATURALES[self.modelo]
+        Modelo = Producto if self.modelo == 'productos' else Promocion
+        desconocidos = set(self.clave) - {campo.name for campo in Modelo._meta.concrete_fields}
+        if desconocidos:
+            raise CommandError(f'--clave: campos desconocidos en {self.modelo}: {", ".join(sorted(desconocidos))}.')
+        self.upsert = options['upsert']
+        self.dry_run = options['dry_run']
+        self.informe = {'leidas': 0, 'creadas': 0, 'actualizadas': 0, 'sin_cambios': 0, 'con_errores': 0}
+        self.errores_mostrados = 0
+
+        inicio = time.perf_counter()
+        fichero = sys.stdin if options['archivo'] == '-' else open(
+            options['archivo'], encoding='utf-8-sig', newline='' if formato == 'csv' else None
+        )
+        try:
+            filas = {'csv': filas_csv, 'json': filas_json, 'ndjson': filas_ndjson}[formato](fichero)
+            numero = 0
+            while True:
+                lote = list(islice(filas, options['lote']))
+                if not lote:
+                    break
+                self.procesar_lote(list(enumerate(lote, start=numero + 1)))
+                numero += len(lote)
+        except (csv.Error, json.JSONDecodeError) as exc:
+            raise CommandError(f'No se pudo leer el fichero: {exc}')
+        finally:
+            if fichero is not sys.stdin:
+                fichero.close()
+
+        duracion = time.perf_counter() - inicio
+        prefijo = '[dry-run] ' if self.dry_run else ''
+        informe = ', '.join(f'{valor} {nombre}' for nombre, valor in self.informe.items())
+        estilo = self.style.WARNING if self.informe['con_errores'] else self.style.SUCCESS
+        self.stdout.write(estilo(f'{prefijo}{self.modelo}: {informe} en {duracion:.2f}s'))
+
+    def error(self, numero, errores):
+        self.informe['con_errores'] += 1
+        if self.errores_mostrados < MAX_ERRORES_MOSTRADOS:
+            self.errores_mostrados += 1
+            self.stderr.write(f'Fila {numero}: {json.dumps(errores, ensure_ascii=False, default=str)}')
+
+    def clave_de(self, datos):
+        return tuple(str(datos.get(campo)) for campo in self.clave)
+
+    def existentes(self, filas):
+        """Instancias ya guardadas con la clave natural de alguna fila del lote, en una consulta por lote de IN."""
+        if not self.upsert:
+            return {}
+        Modelo = Producto if self.modelo == 'productos' else Promocion
+        encontradas = {}
+        # Cada fila aporta un parámetro por campo de la clave
+        for parte in lotes_de_ids(filas, por_elemento=len(self.clave)):
+            # Los campos opcionales pueden faltar en la fila: cuentan como vacíos (None)
+            valores = {campo: {datos.get(campo) for _, datos in parte} for campo in self.clave}
+            for i in Modelo.objects.filter(**{f'{campo}__in': v for campo, v in valores.items()}):
+                encontradas[self.clave_de({campo: getattr(i, campo) for campo in self.clave})] = i
+        return encontradas
+
+    def procesar_lote(self, lote):
+        self.informe['leidas'] += len(lote)
+        lote = [(numero, fila) for numero, fila in lote if self.es_objeto(numero, fila)]
+
+        serializer_class = ProductoSerializer if self.modelo == 'productos' else PromocionImportSerializer
+        # DRF descarta el lote entero si falla una fila: se informa y se valida el resto de nuevo
+        validadas = []
+        while lote:
+            validacion = serializer_class(data=[fila for _, fila in lote], many=True)
+            if validacion.is_valid():
+                validadas = validacion.validated_data
+                break
+            errores = errores_por_posicion(validacion.errors)
+            if not errores:
+                # Error que no señala ninguna fila: se atribuye a todas las del lote
+                errores = dict.fromkeys(range(len(lote)), validacion.errors)
+            for posicion in sorted(errores):
+                self.error(lote[posicion][0], errores[posicion])
+            lote = [fila for posicion, fila in enumerate(lote) if posicion not in errores]
+        validas = [(numero, datos, fila) for (numero, fila), datos in zip(lote, validadas)]
+
+        if self.modelo == 'promociones':
+            validas = self.resolver_productos(validas)
+
+        # Con clave natural repetida dentro del lote gana la última fila
+        if self.upsert:
+            validas = list({self.clave_de(datos): (numero, datos, fila) for numero, datos, fila in validas}.values())
+        guardadas = self.existentes([(numero, datos) for numero, datos, _ in validas])
+        nuevas = [(datos, fila) for _, datos, fila in validas if self.clave_de(datos) not in guardadas]
+        cambios = [(guardadas[self.clave_de(datos)], datos, fila) for _, datos, fila in validas
+                   if self.clave_de(datos) in guardadas]
+        coincidencias = len(cambios)
+        if cambios:
+            enlaces = self.productos_actuales([instancia.pk for instancia, _, _ in cambios])
+            cambios = [cambio for cambio in cambios if self.modifica(*cambio[:2], enlaces)]
+
+        self.informe['creadas'] += len(nuevas)
+        self.informe['actualizadas'] += len(cambios)
+        self.informe['sin_cambios'] += coincidencias - len(cambios)
+        if self.dry_run:
+            return
+        with transaction.atomic():
+            if self.modelo == 'productos':
+                self.guardar_productos(nuevas, cambios)
+            else:
+                self.guardar_promociones(nuevas, cambios)
+
+    def productos_actuales(self, ids):
+        if self.modelo != 'promociones':
+            return {}
+        enlaces = {promocion_id: set() for promocion_id in ids}
+        for lote in lotes_de_ids(ids):
+            for promocion_id, producto_id in Promocion.productos.through.objects.filter(
+                promocion_id__in=lote
+            ).values_list('promocion_id', 'producto_id'):
+                enlaces[promocion_id].add(producto_id)
+        return enlaces
+
+    def modifica(self, instancia, datos, enlaces):
+        # Reimportar el mismo fichero no reescribe filas ni notifica cambios
+        if 'productos' in datos and set(datos['productos']) != enlaces.get(instancia.pk, set()):
+            return True
+        return any(getattr(instancia, campo) != valor for campo, valor in datos.items() if campo != 'productos')
+
+    def es_objeto(self, numero, fila):
+        if isinstance(fila, dict):
+            return True
+        self.error(numero, {'non_field_errors': ['Se esperaba un objeto.']})
+        return False
+
+    def resolver_productos(self, validas):
+        """Convierte las referencias (ids o nombres) de todo el lote con dos consultas (por lote de IN)."""
+        referencias = {str(ref) for _, _, fila in validas for ref in (fila.get('productos') or [])}
+        ids = {int(ref) for ref in referencias if ref.isdigit()}
+        nombres = referencias - {str(i) for i in ids}
+        por_referencia = {}
+        for lote in lotes_de_ids(ids):
+            por_referencia.update((str(i), i) for i in Producto.objects.filter(id__in=lote).values_list('id', flat=True))
+        ambiguos = set()
+        for lote in lotes_de_ids(nombres):
+            for producto_id, nombre in Producto.objects.filter(nombre__in=lote).values_list('id', 'nombre'):
+                if nombre in por_referencia:
+                    ambiguos.add(nombre)
+                por_referencia[nombre] = producto_id
+
+        resueltas = []
+        for numero, datos, fila in validas:
+            if fila.get('productos') is None:
+                # Sin productos en la fila los enlaces actuales no se tocan
+                resueltas.append((numero, datos, fila))
+                continue
+            refs = [str(ref) for ref in (fila.get('productos') or [])]
+            faltan = [ref for ref in refs if ref not in por_referencia]
+            repetidos = [ref for ref in refs if ref in ambiguos]
+            if faltan or repetidos:
+                errores = []
+                if faltan:
+                    errores.append(f'Productos no encontrados: {", ".join(faltan)}.')
+                if repetidos:
+                    errores.append(f'Nombres de producto ambiguos: {", ".join(repetidos)}.')
+                self.error(numero, {'productos': errores})
+                continue
+            datos['productos'] = sorted({por_referencia[ref] for ref in refs})
+            resueltas.append((numero, datos, fila))
+        return resueltas
+
+    def guardar_productos(self, nuevas, cambios):
+        creados = Producto.objects.bulk_create([Producto(**datos) for datos, _ in nuevas])
+        campos = set()
+        for producto, datos, _ in cambios:
+            for campo, valor in datos.items():
+                setattr(producto, campo, valor)
+            campos.update(datos)
+        if cambios:
+            actualizar_por_pk(Producto, [producto for producto, _, _ in cambios], campos)
+
+        # bulk_create/bulk_update no disparan post_save
+        if creados:
+            notificar_cambio_menu(Producto, [producto.pk for producto in creados], 'creado')
+        if cambios:
+            notificar_cambio_menu(Producto, [producto.pk for producto, _, _ in cambios])
+
+    def guardar_promociones(self, nuevas, cambios):
+        productos = {}
+        creadas = Promocion.objects.bulk_create([
+            Promocion(**{campo: valor for campo, valor in datos.items() if campo != 'productos'})
+            for datos, _ in nuevas
+        ])
+        for promocion, (datos, _) in zip(creadas, nuevas):
+            productos[promocion.pk] = datos.get('productos', [])
+
+        campos = set()
+        for promocion, datos, _ in cambios:
+            for campo, valor in datos.items():
+                if campo != 'productos':
+                    setattr(promocion, campo, valor)
+                    campos.add(campo)
+            if 'productos' in datos:
+                productos[promocion.pk] = datos['productos']
+        if campos:
+            actualizar_por_pk(Promocion, [promocion for promocion, _, _ in cambios], campos)
+
+        # Relación M2M reemplazada en bloque solo para las filas que traen productos
+        Enlace = Promocion.productos.through
+        for lote in lotes_de_ids(promocion.pk for promocion, datos, _ in cambios if 'productos' in datos):
+            Enlace.objects.filter(promocion_id__in=lote).delete()
+        Enlace.objects.bulk_create([
+            Enlace(promocion_id=promocion_id, producto_id=producto_id)
+            for promocion_id, ids in productos.items()
+            for producto_id in ids
+        ])
+
+        if creadas:
+            notificar_cambio_menu(Promocion, [promocion.pk for promocion in creadas], 'creado')
+        if cambios:
+            notificar_cambio_menu(Promocion, [promocion.pk for promocion, _, _ in cambios])
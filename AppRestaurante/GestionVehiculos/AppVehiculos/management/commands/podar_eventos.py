@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from AppVehiculos.models import EventoMenu
+
+
+class Command(BaseCommand):
+    help = 'Elimina los eventos del menú más antiguos que --horas (los clientes que vuelvan después recargan el menú).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24)
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas'])
+        total, _ = EventoMenu.objects.filter(creado_en__lt=limite).delete()
+        self.stdout.write(f'{total} eventos eliminados')
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from AppVehiculos.models import lotes_de_ids
+
+
+class Command(BaseCommand):
+    help = 'Elimina por lotes los refresh tokens expirados (y sus entradas en la lista negra).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=5000,
+            help='Tokens expirados por lote; el DELETE se parte según el límite de parámetros.'
+        )
+        parser.add_argument(
+            '--cada', type=int, default=0,
+            help='Repetir cada N segundos (proceso en segundo plano). 0 ejecuta una sola vez.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = self.podar(options['lote'])
+            self.stdout.write(f'{total} tokens expirados eliminados')
+            if not options['cada']:
+                break
+            time.sleep(options['cada'])
+
+    def podar(self, lote):
+        total = 0
+        while True:
+            # Lotes pequeños para no bloquear la tabla durante los refrescos
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+                .values_list('id', flat=True)[:lote]
+            )
+            if not ids:
+                return total
+            for parte in lotes_de_ids(ids):
+                OutstandingToken.objects.filter(id__in=parte).delete()
+            total += len(ids)
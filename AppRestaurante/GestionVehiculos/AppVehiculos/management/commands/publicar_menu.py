@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from AppVehiculos.snapshots import publicar_menu
+
+
+class Command(BaseCommand):
+    help = 'Publica el snapshot estático del menú (ficheros versionados, .gz y manifest.json).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directorio', help='Por defecto MENU_SNAPSHOT_DIR.')
+        parser.add_argument('--forzar', action='store_true', help='Reescribe aunque el contenido no haya cambiado.')
+
+    def handle(self, *args, **options):
+        directorio = options['directorio'] or settings.MENU_SNAPSHOT_DIR
+        if not directorio:
+            raise CommandError('Indique --directorio o configure MENU_SNAPSHOT_DIR.')
+        manifiesto = publicar_menu(directorio, forzar=options['forzar'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Menú {manifiesto["version"]} publicado en {directorio}: {manifiesto["productos"]} productos, '
+            f'{manifiesto["promociones"]} promociones, {manifiesto["bytes"]} bytes ({manifiesto["bytes_gzip"]} gzip)'
+        ))
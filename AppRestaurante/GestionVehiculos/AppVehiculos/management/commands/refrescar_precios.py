@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from AppVehiculos.cache import invalidar_menu
+from AppVehiculos.pricing import refrescar_precios
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la tabla materializada de precios vigentes (ejecutar a diario tras la medianoche).'
+
+    def handle(self, *args, **options):
+        total = refrescar_precios()
+        invalidar_menu()
+        self.stdout.write(self.style.SUCCESS(f'{total} precios vigentes recalculados'))
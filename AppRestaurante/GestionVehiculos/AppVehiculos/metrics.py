@@ -0,0 +1,136 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Límites superiores (le) de los histogramas, al estilo de los clientes de Prometheus
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+class Medicion:
+    """SQL acumulado durante una petición; vive en una ContextVar."""
+    __slots__ = ('consultas', 'sql')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+
+
+# asgiref copia el contexto a los hilos de sync_to_async, así que las vistas
+# asíncronas también suman sobre la Medicion de su petición
+medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+def contar_consulta(execute, sql, params, many, context):
+    medicion = medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+@receiver(connection_created)
+def _instalar_contador(sender, connection, **kwargs):
+    # Las conexiones se reabren (CONN_MAX_AGE); el wrapper se instala una sola vez
+    if contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consulta)
+
+
+class Histograma:
+    __slots__ = ('limites', 'cuentas', 'suma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            yield limite, acumulado
+        yield '+Inf', self.total
+
+
+class RegistroMetricas:
+    """Histogramas por vista y método, en memoria del proceso.
+
+    Cada worker de gunicorn/uvicorn tiene su propio registro; Prometheus debe
+    consultar cada proceso o usarse un único worker por instancia.
+    """
+    FAMILIAS = (
+        ('restaurante_peticion_segundos', 'Tiempo del manejador por vista.', 'duracion'),
+        ('restaurante_sql_segundos', 'Tiempo total de SQL por petición.', 'sql'),
+        ('restaurante_sql_consultas', 'Consultas SQL por petición.', 'consultas'),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._series = {}
+            self._respuestas = {}
+
+    def observar(self, vista, metodo, codigo, duracion, sql, consultas):
+        clave = (vista, metodo)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {
+                    'duracion': Histograma(BUCKETS_SEGUNDOS),
+                    'sql': Histograma(BUCKETS_SEGUNDOS),
+                    'consultas': Histograma(BUCKETS_CONSULTAS),
+                }
+            serie['duracion'].observar(duracion)
+            serie['sql'].observar(sql)
+            serie['consultas'].observar(consultas)
+            clave_respuesta = (vista, metodo, codigo)
+            self._respuestas[clave_respuesta] = self._respuestas.get(clave_respuesta, 0) + 1
+
+    def exportar(self):
+        """Formato de texto de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            series = {
+                clave: {nombre: (list(h.acumulados()), h.suma, h.total) for nombre, h in serie.items()}
+                for clave, serie in self._series.items()
+            }
+            respuestas = dict(self._respuestas)
+
+        lineas = [
+            '# HELP restaurante_peticiones_total Peticiones atendidas por vista, método y código.',
+            '# TYPE restaurante_peticiones_total counter',
+        ]
+        for (vista, metodo, codigo), total in sorted(respuestas.items()):
+            lineas.append(
+                f'restaurante_peticiones_total{{vista="{vista}",metodo="{metodo}",codigo="{codigo}"}} {total}'
+            )
+        for familia, ayuda, campo in self.FAMILIAS:
+            lineas.append(f'# HELP {familia} {ayuda}')
+            lineas.append(f'# TYPE {familia} histogram')
+            for (vista, metodo), serie in sorted(series.items()):
+                etiquetas = f'vista="{vista}",metodo="{metodo}"'
+                buckets, suma, total = serie[campo]
+                for limite, acumulado in buckets:
+                    lineas.append(f'{familia}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                lineas.append(f'{familia}_sum{{{etiquetas}}} {suma:.6f}')
+                lineas.append(f'{familia}_count{{{etiquetas}}} {total}')
+        return '\n'.join(lineas) + '\n'
+
+
+metricas = RegistroMetricas()
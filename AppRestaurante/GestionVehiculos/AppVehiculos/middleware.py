@@ -0,0 +1,117 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import Medicion, medicion_actual, metricas
+from .routers import fijar_primaria, lectura_en_replica
+
+COOKIE_PRIMARIA = 'usar_primaria'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class MetricasMiddleware:
+    """Mide cada petición: vista resuelta, consultas SQL, tiempo de SQL y del manejador.
+
+    Añade la cabecera ``Server-Timing`` y alimenta los histogramas servidos en
+    /api/metricas/. En respuestas en streaming (SSE) solo se mide hasta que
+    la vista devuelve la respuesta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            medicion_actual.reset(token)
+        return self.registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    def registrar(self, request, response, medicion, duracion):
+        # Las rutas sin resolver (404) comparten una sola serie para acotar la cardinalidad
+        coincidencia = request.resolver_match
+        vista = coincidencia.view_name if coincidencia else 'sin_resolver'
+        metricas.observar(vista, request.method, response.status_code, duracion, medicion.sql, medicion.consultas)
+        if getattr(settings, 'METRICAS_SERVER_TIMING', True):
+            response['Server-Timing'] = (
+                f'db;dur={medicion.sql * 1000:.2f};desc="{medicion.consultas} consultas", '
+                f'app;dur={duracion * 1000:.2f};desc="{vista}"'
+            )
+        return response
+
+
+class ReplicaLecturaMiddleware:
+    """Permite leer de las réplicas en las vistas marcadas con ``lectura_en_replica = True``.
+
+    Tras una escritura correcta, durante ``REPLICA_STICKY_SEGUNDOS`` las
+    lecturas de ese cliente van a la primaria para que vea sus propios cambios
+    aunque la réplica vaya con retraso: por cookie y, si está autenticado, por
+    usuario (lo comprueba LecturaEnReplicaMixin tras autenticar).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        token = lectura_en_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            lectura_en_replica.reset(token)
+        return self.fijar_primaria(request, response)
+
+    async def __acall__(self, request):
+        token = lectura_en_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            lectura_en_replica.reset(token)
+        return self.fijar_primaria(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        vista = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if (
+            request.method in METODOS_SEGUROS
+            and getattr(vista, 'lectura_en_replica', False)
+            and COOKIE_PRIMARIA not in request.COOKIES
+        ):
+            lectura_en_replica.set(True)
+
+    def fijar_primaria(self, request, response):
+        if settings.BASES_LECTURA and request.method not in METODOS_SEGUROS and response.status_code < 400:
+            # DRF deja en request.user el usuario autenticado por JWT
+            usuario = getattr(request, 'user', None)
+            if usuario is not None and usuario.is_authenticated:
+                fijar_primaria(usuario.pk)
+            response.set_cookie(
+                COOKIE_PRIMARIA, '1', max_age=settings.REPLICA_STICKY_SEGUNDOS, httponly=True, samesite='Lax'
+            )
+        return response
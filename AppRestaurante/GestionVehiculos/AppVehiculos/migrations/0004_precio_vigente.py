@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('AppVehiculos', '0003_producto_indices_listado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioVigente',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='precio_vigente', serialize=False, to='AppVehiculos.producto')),
+                ('fecha', models.DateField()),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('descuento', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('precio_final', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('promocion', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='AppVehiculos.promocion')),
+            ],
+        ),
+    ]
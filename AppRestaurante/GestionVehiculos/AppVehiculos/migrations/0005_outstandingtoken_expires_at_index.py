@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('AppVehiculos', '0004_precio_vigente'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    # La poda de tokens expirados filtra por expires_at, que simplejwt no indexa
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS outstandingtoken_expires_at_idx '
+                'ON token_blacklist_outstandingtoken (expires_at)',
+            reverse_sql='DROP INDEX IF EXISTS outstandingtoken_expires_at_idx',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('AppVehiculos', '0006_pedido_lineapedido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoMenu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=20)),
+                ('accion', models.CharField(max_length=20)),
+                ('ids', models.JSONField(default=list)),
+                ('creado_en', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
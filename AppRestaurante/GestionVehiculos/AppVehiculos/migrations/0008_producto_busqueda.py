@@ -0,0 +1,49 @@
+from django.db import migrations
+
+TABLA_FTS = 'AppVehiculos_producto_fts'
+
+SQLITE = [
+    # Sin tildes (remove_diacritics) y sin distinguir mayúsculas
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS "{TABLA_FTS}" USING fts5('
+    f"nombre, descripcion, tokenize = 'unicode61 remove_diacritics 2')",
+    f'INSERT INTO "{TABLA_FTS}" (rowid, nombre, descripcion) '
+    f'SELECT id, nombre, descripcion FROM "AppVehiculos_producto"',
+]
+
+POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS unaccent',
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    # unaccent() no es IMMUTABLE y no puede usarse directamente en un índice
+    "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS "
+    "$$ SELECT public.unaccent('public.unaccent', $1) $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+    'CREATE INDEX IF NOT EXISTS producto_busqueda_tsv_idx ON "AppVehiculos_producto" '
+    "USING GIN (to_tsvector('spanish', f_unaccent(nombre || ' ' || descripcion)))",
+    'CREATE INDEX IF NOT EXISTS producto_nombre_trgm_idx ON "AppVehiculos_producto" '
+    'USING GIN (f_unaccent(lower(nombre)) gin_trgm_ops)',
+]
+
+
+def crear_indice(apps, schema_editor):
+    sentencias = {'sqlite': SQLITE, 'postgresql': POSTGRESQL}.get(schema_editor.connection.vendor, [])
+    for sentencia in sentencias:
+        schema_editor.execute(sentencia)
+
+
+def eliminar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{TABLA_FTS}"')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS producto_busqueda_tsv_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS producto_nombre_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('AppVehiculos', '0007_eventomenu'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
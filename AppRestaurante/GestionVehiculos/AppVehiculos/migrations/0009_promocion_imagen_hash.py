@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('AppVehiculos', '0008_producto_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='promocion',
+            name='imagen_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='promocion',
+            name='imagen_lista',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('AppVehiculos', '0009_promocion_imagen_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocion',
+            index=models.Index(fields=['estado', 'fecha_inicio', 'fecha_fin'], name='promocion_activa_idx'),
+        ),
+    ]
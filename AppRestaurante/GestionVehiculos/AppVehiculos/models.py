@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import connection, models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 class Empleado(AbstractUser):
     TIPO_EMPLEADO_CHOICES = [
@@ -16,6 +17,14 @@ class Empleado(AbstractUser):
     def is_admin(self):
         return self.tipo_empleado == 'ADM'
 
+class ProductoQuerySet(models.QuerySet):
+    def alternar_estado(self):
+        # Un único UPDATE con CASE sobre el valor actual de cada fila
+        return self.update(estado=models.Case(
+            models.When(estado='DISPONIBLE', then=models.Value('FUERA_STOCK')),
+            default=models.Value('DISPONIBLE'),
+        ))
+
 class Producto(models.Model):
     CATEGORIA_CHOICES = [
         ('PLATO_PRINCIPAL', 'Plato Principal'),
@@ -36,9 +45,61 @@ class Producto(models.Model):
     precio = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0.01)])
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='DISPONIBLE')
 
+    objects = ProductoQuerySet.as_manager()
+
+    class Meta:
+        # Índices para el listado paginado por id con filtros de categoría/estado
+        indexes = [
+            models.Index(fields=['categoria', 'estado', 'id'], name='producto_cat_estado_id_idx'),
+            models.Index(fields=['categoria', 'id'], name='producto_categoria_id_idx'),
+            models.Index(fields=['estado', 'id'], name='producto_estado_id_idx'),
+        ]
+
     def __str__(self):
         return self.nombre
     
+def filtro_promociones_activas(fecha, prefijo=''):
+    # ``prefijo`` permite filtrar desde otra tabla, p. ej. 'promocion__' en la intermedia
+    return models.Q(**{
+        f'{prefijo}estado': 'ACTIVA',
+        f'{prefijo}fecha_inicio__lte': fecha,
+        f'{prefijo}fecha_fin__gte': fecha,
+    })
+
+
+def lotes_de_ids(ids, reservados=20, por_elemento=1):
+    """Parte ``ids`` en listas que caben en un IN junto a ``reservados`` parámetros más.
+
+    ``por_elemento`` es el número de parámetros que aporta cada elemento (p. ej.
+    una fila filtrada por varios campos). SQLite admite 999 parámetros por
+    consulta (``max_query_params``); en PostgreSQL no hay límite y se devuelve
+    un único lote.
+    """
+    ids = list(ids)
+    limite = connection.features.max_query_params
+    tamano = max(len(ids), 1) if limite is None else (limite - reservados) // por_elemento
+    return [ids[inicio:inicio + tamano] for inicio in range(0, len(ids), tamano)]
+
+class PromocionQuerySet(models.QuerySet):
+    def activas(self, fecha=None):
+        return self.filter(filtro_promociones_activas(fecha or timezone.now().date()))
+
+    def no_activas(self, fecha=None):
+        return self.exclude(filtro_promociones_activas(fecha or timezone.now().date()))
+
+    def con_activa(self, fecha=None):
+        # Anota ``activa`` en SQL en lugar de llamar a esta_activa() por fila
+        return self.annotate(activa=models.ExpressionWrapper(
+            filtro_promociones_activas(fecha or timezone.now().date()), output_field=models.BooleanField()
+        ))
+
+    def expiradas(self, fecha=None):
+        return self.filter(estado='ACTIVA', fecha_fin__lt=fecha or timezone.now().date())
+
+    def solapadas(self, fecha_inicio, fecha_fin):
+        # Activas en algún día de [fecha_inicio, fecha_fin]
+        return self.filter(estado='ACTIVA', fecha_inicio__lte=fecha_fin, fecha_fin__gte=fecha_inicio)
+
 class Promocion(models.Model):
     ESTADO_CHOICES = [
         ('ACTIVA', 'Activa'),
@@ -53,11 +114,85 @@ class Promocion(models.Model):
     fecha_fin = models.DateField()
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='ACTIVA')
     imagen = models.ImageField(upload_to='promociones/', null=True, blank=True)
+    # Direccionamiento por contenido: sha256 del original y si sus versiones reducidas ya existen
+    imagen_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    imagen_lista = models.BooleanField(default=False, editable=False)
+
+    objects = PromocionQuerySet.as_manager()
+
+    class Meta:
+        # Consulta "activas en la fecha D": estado = 'ACTIVA' AND fecha_inicio <= D AND fecha_fin >= D
+        indexes = [
+            models.Index(fields=['estado', 'fecha_inicio', 'fecha_fin'], name='promocion_activa_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
     def esta_activa(self):
-        from django.utils import timezone
         hoy = timezone.now().date()
-        return self.estado == 'ACTIVA' and self.fecha_inicio <= hoy <= self.fecha_fin
\ No newline at end of file
+        return self.estado == 'ACTIVA' and self.fecha_inicio <= hoy <= self.fecha_fin
+
+class PrecioVigente(models.Model):
+    # Tabla materializada con el precio que paga el cliente en la fecha indicada
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='precio_vigente')
+    fecha = models.DateField()
+    precio = models.DecimalField(max_digits=10, decimal_places=2)
+    descuento = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    precio_final = models.DecimalField(max_digits=10, decimal_places=2)
+    # Sin restricción en BD para poder recalcular los productos de una promoción ya eliminada
+    promocion = models.ForeignKey(
+        Promocion, null=True, blank=True, on_delete=models.DO_NOTHING,
+        db_constraint=False, related_name='+'
+    )
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.precio_final}"
+
+
+class Pedido(models.Model):
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PREPARACION', 'En Preparación'),
+        ('LISTO', 'Listo'),
+        ('ENTREGADO', 'Entregado'),
+        ('CANCELADO', 'Cancelado'),
+    ]
+
+    mesa = models.CharField(max_length=20, blank=True)
+    mesero = models.ForeignKey(Empleado, null=True, blank=True, on_delete=models.SET_NULL, related_name='pedidos')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    notas = models.TextField(blank=True)
+    creado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Cola de cocina: pedidos por estado en orden de llegada (el id crece con la llegada)
+        indexes = [
+            models.Index(fields=['estado', 'id'], name='pedido_cola_cocina_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pedido {self.id} ({self.get_estado_display()})"
+
+
+class LineaPedido(models.Model):
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='lineas')
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name='lineas_pedido')
+    cantidad = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    notas = models.CharField(max_length=200, blank=True)
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto_id}"
+
+
+class EventoMenu(models.Model):
+    # Registro de cambios del menú para el stream SSE (se reanuda por id)
+    modelo = models.CharField(max_length=20)
+    accion = models.CharField(max_length=20)
+    ids = models.JSONField(default=list)
+    creado_en = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.id}: {self.modelo} {self.accion}"
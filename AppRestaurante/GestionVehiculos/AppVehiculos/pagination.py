@@ -0,0 +1,52 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacionOpcional(CursorPagination):
+    """Paginación por cursor (keyset) ordenada por id.
+
+    Solo se activa cuando el cliente envía ``cursor`` o ``page_size``; sin
+    esos parámetros la vista responde la lista completa como antes.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def solicitada(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.solicitada(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class PaginadorConteoEstimado(Paginator):
+    """Paginator del admin que evita el COUNT(*) exacto en tablas grandes.
+
+    Sin filtros y en PostgreSQL usa la estimación del planificador
+    (``pg_class.reltuples``); con filtros, en otras bases de datos o si la
+    tabla es pequeña cuenta de forma exacta.
+    """
+    minimo_estimado = 10_000
+
+    @cached_property
+    def count(self):
+        consulta = getattr(self.object_list, 'query', None)
+        if consulta is None or consulta.where or consulta.distinct:
+            return super().count
+        conexion = connections[self.object_list.db]
+        if conexion.vendor != 'postgresql':
+            return super().count
+        tabla = conexion.ops.quote_name(self.object_list.model._meta.db_table)
+        with conexion.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [tabla])
+            fila = cursor.fetchone()
+        # reltuples es -1 si la tabla nunca se analizó
+        if fila is None or fila[0] < self.minimo_estimado:
+            return super().count
+        return fila[0]
@@ -1,5 +1,8 @@
 from rest_framework.permissions import BasePermission
 
+# request.user puede ser un Empleado o un EmpleadoToken construido desde el JWT;
+# ambos exponen is_admin() y tipo_empleado sin consultar la BD.
+
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.is_admin()
@@ -0,0 +1,90 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.utils import timezone
+
+from .models import PrecioVigente, Producto, Promocion, filtro_promociones_activas, lotes_de_ids
+
+CENTAVOS = Decimal('0.01')
+CIEN = Decimal('100')
+
+
+def precio_con_descuento(precio, descuento):
+    descuento = min(descuento, CIEN)
+    return (precio * (CIEN - descuento) / CIEN).quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+def mejores_descuentos(fecha, producto_ids=None):
+    """Mejor promoción activa en ``fecha`` por producto: {producto_id: (descuento, promocion_id)}.
+
+    Se resuelve en una consulta sobre la tabla intermedia (una por lote de
+    ``producto_ids``), ordenada para que la primera fila de cada producto sea
+    la de mayor descuento.
+    """
+    relaciones = Promocion.productos.through.objects.filter(filtro_promociones_activas(fecha, 'promocion__'))
+    consultas = [relaciones] if producto_ids is None else [
+        relaciones.filter(producto_id__in=lote) for lote in lotes_de_ids(producto_ids)
+    ]
+    mejores = {}
+    for consulta in consultas:
+        for producto_id, descuento, promocion_id in consulta.order_by(
+            'producto_id', '-promocion__descuento', 'promocion_id'
+        ).values_list('producto_id', 'promocion__descuento', 'promocion_id'):
+            mejores.setdefault(producto_id, (descuento, promocion_id))
+    return mejores
+
+
+def calcular_precios(fecha=None, producto_ids=None):
+    fecha = fecha or timezone.now().date()
+    if producto_ids is None:
+        productos = Producto.objects.order_by('id')
+    else:
+        producto_ids = sorted(set(producto_ids))
+        productos = (
+            producto
+            for lote in lotes_de_ids(producto_ids)
+            for producto in Producto.objects.filter(id__in=lote).order_by('id')
+        )
+    mejores = mejores_descuentos(fecha, producto_ids)
+
+    precios = []
+    for producto in productos:
+        descuento, promocion_id = mejores.get(producto.id, (Decimal('0'), None))
+        precios.append(PrecioVigente(
+            producto=producto,
+            fecha=fecha,
+            precio=producto.precio,
+            descuento=descuento,
+            precio_final=precio_con_descuento(producto.precio, descuento),
+            promocion_id=promocion_id,
+        ))
+    return precios
+
+
+def refrescar_precios(producto_ids=None, fecha=None):
+    precios = calcular_precios(fecha, producto_ids)
+    PrecioVigente.objects.bulk_create(
+        precios,
+        update_conflicts=True,
+        unique_fields=['producto'],
+        update_fields=['fecha', 'precio', 'descuento', 'precio_final', 'promocion'],
+        batch_size=1000,
+    )
+    return len(precios)
+
+
+def productos_de_promociones(promocion_ids):
+    # Productos enlazados ahora y los que tenían a estas promociones como mejor precio
+    productos = set()
+    for lote in lotes_de_ids(promocion_ids):
+        productos.update(Promocion.productos.through.objects.filter(
+            promocion_id__in=lote
+        ).values_list('producto_id', flat=True))
+        productos.update(PrecioVigente.objects.filter(promocion_id__in=lote).values_list('producto_id', flat=True))
+    return productos
+
+
+def asegurar_precios_vigentes(fecha=None):
+    # Recalcula todo si cambió el día o hay productos sin fila materializada
+    fecha = fecha or timezone.now().date()
+    if Producto.objects.exclude(precio_vigente__fecha=fecha).exists():
+        refrescar_precios(fecha=fecha)
@@ -0,0 +1,85 @@
+import decimal
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el JSON de DRF
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # El formato MessagePack solo se ofrece si está instalado
+    msgpack = None
+
+_codificador_drf = JSONEncoder()
+
+
+def codificar_tipo(obj):
+    # Decimal como texto para no perder precisión; el resto como lo hace DRF
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return _codificador_drf.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer de DRF con orjson: misma salida compacta, bastante más rápido.
+
+    Las fechas con zona UTC terminan en ``Z`` como en DRF y los Decimal que no
+    haya convertido ya el serializer salen como cadena.
+    """
+    opciones = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=codificar_tipo, option=self.opciones)
+        # Igual que DRF: U+2028/U+2029 escapados para que sea un subconjunto estricto de JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=codificar_tipo, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+
+def renderer_para(accept):
+    """Negociación mínima para las vistas que no pasan por DRF (async)."""
+    if msgpack is not None and MessagePackRenderer.media_type in (accept or ''):
+        return MessagePackRenderer()
+    return ORJSONRenderer()
@@ -0,0 +1,69 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# True mientras se atiende una petición de lectura que puede ir a las réplicas
+# (la activa ReplicaLecturaMiddleware según la vista)
+lectura_en_replica = ContextVar('lectura_en_replica', default=False)
+
+# Usuarios, sesiones, permisos y tokens siempre se leen de la primaria
+APPS_PRIMARIA = {'admin', 'auth', 'contenttypes', 'sessions', 'token_blacklist'}
+
+
+def clave_primaria(usuario_id):
+    return f'replica:primaria:{usuario_id}'
+
+
+def fijar_primaria(usuario_id):
+    # Por usuario y no solo por cookie: una SPA en otro origen con JWT no envía cookies.
+    # Con varios procesos requiere una caché compartida (p. ej. Redis).
+    cache.set(clave_primaria(usuario_id), True, settings.REPLICA_STICKY_SEGUNDOS)
+
+
+def primaria_fijada(usuario):
+    return bool(usuario and usuario.is_authenticated) and cache.get(clave_primaria(usuario.pk)) is not None
+
+
+def lee_de_replica():
+    """Si las lecturas de modelos del menú de esta petición irán a una réplica."""
+    return (
+        bool(settings.BASES_LECTURA)
+        and lectura_en_replica.get()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class RouterReplicas:
+    """Envía a una réplica (``BASES_LECTURA``) las lecturas de las vistas de solo lectura.
+
+    Las escrituras, las demás lecturas y cualquier lectura dentro de una
+    transacción abierta en la primaria van a ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not lectura_en_replica.get() or not settings.BASES_LECTURA:
+            return None
+        if model._meta.app_label in APPS_PRIMARIA or model._meta.label == settings.AUTH_USER_MODEL:
+            return DEFAULT_DB_ALIAS
+        if not lee_de_replica():
+            # La transacción debe ver sus propias escrituras
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.BASES_LECTURA)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, *settings.BASES_LECTURA}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Las réplicas reciben el esquema por replicación, no por migrate
+        if db in settings.BASES_LECTURA:
+            return False
+        return None
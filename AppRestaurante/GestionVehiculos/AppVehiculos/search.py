@@ -0,0 +1,110 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Producto, lotes_de_ids
+
+TABLA_FTS = 'AppVehiculos_producto_fts'
+TERMINO = re.compile(r'\w+', re.UNICODE)
+# Mismas expresiones que los índices de la migración 0008 para que PostgreSQL los use
+DOCUMENTO_PG = "to_tsvector('spanish', f_unaccent(p.nombre || ' ' || p.descripcion))"
+NOMBRE_PG = 'f_unaccent(lower(p.nombre))'
+
+
+def terminos(texto):
+    return TERMINO.findall(texto.lower())[:8]
+
+
+def indexar_productos(ids):
+    """Sincroniza el índice FTS5 de SQLite; en PostgreSQL los índices de expresión se mantienen solos."""
+    if connection.vendor != 'sqlite' or not ids:
+        return
+    with connection.cursor() as cursor:
+        for lote in lotes_de_ids(ids):
+            marcadores = ', '.join(['%s'] * len(lote))
+            cursor.execute(f'DELETE FROM "{TABLA_FTS}" WHERE rowid IN ({marcadores})', lote)
+            cursor.execute(
+                f'INSERT INTO "{TABLA_FTS}" (rowid, nombre, descripcion) '
+                f'SELECT id, nombre, descripcion FROM "AppVehiculos_producto" WHERE id IN ({marcadores})',
+                lote,
+            )
+
+
+def buscar_productos(texto, limite=20):
+    """Productos que coinciden con ``texto`` ordenados por relevancia.
+
+    Sin tildes, sin distinguir mayúsculas y con el último término como
+    prefijo para el autocompletado.
+    """
+    partes = terminos(texto)
+    if not partes:
+        return []
+    if connection.vendor == 'sqlite':
+        return list(_buscar_sqlite(partes, limite))
+    if connection.vendor == 'postgresql':
+        return list(_buscar_postgresql(partes, limite))
+    return list(Producto.objects.filter(_filtro_icontains(partes)).order_by('nombre')[:limite])
+
+
+def filtro_busqueda(texto):
+    """Q con todos los productos que coinciden con ``texto``, sin orden ni límite.
+
+    Para filtrar querysets (listado y autocompletado del admin) con el índice
+    de texto completo en lugar de LIKE '%...%' sobre cada columna.
+    """
+    partes = terminos(texto)
+    if not partes:
+        return Q()
+    if connection.vendor == 'sqlite':
+        return Q(id__in=RawSQL(
+            f'SELECT rowid FROM "{TABLA_FTS}" WHERE "{TABLA_FTS}" MATCH %s', [_consulta_sqlite(partes)]
+        ))
+    if connection.vendor == 'postgresql':
+        return Q(id__in=RawSQL(
+            f'SELECT p.id FROM "AppVehiculos_producto" p '
+            f"WHERE {DOCUMENTO_PG} @@ to_tsquery('spanish', f_unaccent(%s)) OR {NOMBRE_PG} %% f_unaccent(%s)",
+            [_consulta_postgresql(partes), ' '.join(partes)],
+        ))
+    return _filtro_icontains(partes)
+
+
+def _filtro_icontains(partes):
+    filtro = Q()
+    for parte in partes:
+        filtro &= Q(nombre__icontains=parte) | Q(descripcion__icontains=parte)
+    return filtro
+
+
+def _consulta_sqlite(partes):
+    # Todos los términos como prefijo
+    return ' '.join(f'"{parte}"*' for parte in partes)
+
+
+def _consulta_postgresql(partes):
+    return ' & '.join(f'{parte}:*' for parte in partes)
+
+
+def _buscar_sqlite(partes, limite):
+    # bm25 pondera más el nombre que la descripción
+    consulta = _consulta_sqlite(partes)
+    return Producto.objects.raw(
+        f'SELECT p.* FROM "{TABLA_FTS}" f JOIN "AppVehiculos_producto" p ON p.id = f.rowid '
+        f'WHERE "{TABLA_FTS}" MATCH %s ORDER BY bm25("{TABLA_FTS}", 10.0, 1.0), p.id LIMIT %s',
+        [consulta, limite],
+    )
+
+
+def _buscar_postgresql(partes, limite):
+    consulta = _consulta_postgresql(partes)
+    texto = ' '.join(partes)
+    documento, nombre = DOCUMENTO_PG, NOMBRE_PG
+    return Producto.objects.raw(
+        f'SELECT p.* FROM "AppVehiculos_producto" p '
+        f"WHERE {documento} @@ to_tsquery('spanish', f_unaccent(%s)) "
+        f'OR {nombre} %% f_unaccent(%s) '
+        f"ORDER BY ts_rank({documento}, to_tsquery('spanish', f_unaccent(%s))) DESC, "
+        f'similarity({nombre}, f_unaccent(%s)) DESC, p.id LIMIT %s',
+        [consulta, texto, consulta, texto, limite],
+    )
@@ -1,12 +1,21 @@
 from rest_framework import serializers
-from .models import Empleado, Producto, Promocion
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .models import Empleado, LineaPedido, Pedido, PrecioVigente, Producto, Promocion, lotes_de_ids
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .tokens import RefreshTokenConCache
+from .pricing import calcular_precios
+from .imagenes import urls_imagen, urls_rendiciones
+from django.db import transaction
+from django.utils import timezone
+from django.core.files.storage import default_storage
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshTokenConCache
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
         token['tipo_empleado'] = user.tipo_empleado
+        token['username'] = user.username
         return token
 
     def validate(self, attrs):
@@ -19,6 +28,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         })
         return data
 
+class TokenRefreshConCacheSerializer(TokenRefreshSerializer):
+    token_class = RefreshTokenConCache
+
 class EmpleadoSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
@@ -29,6 +41,35 @@ class EmpleadoSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         return Empleado.objects.create_user(**validated_data)
 
+class ProductoListSerializer(serializers.ListSerializer):
+    # Para actualizaciones masivas self.instance es el dict devuelto por in_bulk()
+    def run_child_validation(self, data):
+        if not isinstance(self.instance, dict):
+            return super().run_child_validation(data)
+        self.child.instance = self.instance.get(data.get('id'))
+        if self.child.instance is None:
+            raise serializers.ValidationError({'id': ['Producto no encontrado.']})
+        validated = super().run_child_validation(data)
+        validated['id'] = self.child.instance.pk
+        return validated
+
+    def create(self, validated_data):
+        productos = [Producto(**datos) for datos in validated_data]
+        return Producto.objects.bulk_create(productos, batch_size=1000)
+
+    def update(self, instance, validated_data):
+        productos = []
+        campos = set()
+        for datos in validated_data:
+            producto = instance[datos.pop('id')]
+            for campo, valor in datos.items():
+                setattr(producto, campo, valor)
+            campos.update(datos)
+            productos.append(producto)
+        if campos:
+            Producto.objects.bulk_update(productos, sorted(campos), batch_size=1000)
+        return productos
+
 class ProductoSerializer(serializers.ModelSerializer):
     categoria_nombre = serializers.CharField(source='get_categoria_display', read_only=True)
     estado_nombre = serializers.CharField(source='get_estado_display', read_only=True)
@@ -36,15 +77,305 @@ class ProductoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = '__all__'
+        list_serializer_class = ProductoListSerializer
+
+class ProductosPorLoteField(serializers.ManyRelatedField):
+    """Lista de ids de producto validada con una sola consulta, no una por id.
+
+    Devuelve los ids sin repetir en el orden recibido e informa de todos los
+    que no existen a la vez.
+    """
+    default_error_messages = {
+        'no_existen': 'Productos inexistentes: {ids}.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('child_relation', serializers.PrimaryKeyRelatedField(queryset=Producto.objects.all()))
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        ids = []
+        for valor in data:
+            if isinstance(valor, bool):
+                self.child_relation.fail('incorrect_type', data_type=type(valor).__name__)
+            try:
+                ids.append(int(valor))
+            except (TypeError, ValueError):
+                self.child_relation.fail('incorrect_type', data_type=type(valor).__name__)
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return ids
+        existentes = set()
+        for lote in lotes_de_ids(ids):
+            existentes.update(self.child_relation.get_queryset().filter(id__in=lote).values_list('id', flat=True))
+        faltan = [producto_id for producto_id in ids if producto_id not in existentes]
+        if faltan:
+            self.fail('no_existen', ids=', '.join(map(str, faltan)))
+        return ids
+
+
+def conflictos_promocion(fecha_inicio, fecha_fin, productos, excluir=None):
+    """Promociones activas que se solapan en fechas y comparten productos.
+
+    ``productos`` es una lista de ids o un queryset de ids. Una consulta sobre
+    la tabla intermedia por lote de ids (una sola con un queryset).
+    """
+    enlaces = Promocion.productos.through.objects.filter(
+        promocion__in=Promocion.objects.solapadas(fecha_inicio, fecha_fin).exclude(pk=excluir)
+    )
+    if isinstance(productos, list):
+        consultas = [enlaces.filter(producto_id__in=lote) for lote in lotes_de_ids(sorted(productos))]
+    else:
+        consultas = [enlaces.filter(producto_id__in=productos)]
+    conflictos = {}
+    for consulta in consultas:
+        for promocion_id, nombre, producto_id in consulta.order_by('promocion_id', 'producto_id').values_list(
+            'promocion_id', 'promocion__nombre', 'producto_id'
+        ):
+            conflicto = conflictos.setdefault(
+                promocion_id, {'promocion': promocion_id, 'nombre': nombre, 'productos': []}
+            )
+            conflicto['productos'].append(producto_id)
+    return sorted(conflictos.values(), key=lambda conflicto: conflicto['promocion'])
+
+
+def enlazar_productos(promocion, ids, nueva=False):
+    """Reemplaza los productos de la promoción con INSERT/DELETE masivos.
+
+    Sustituye a ``promocion.productos.set()``, que filtra con un IN de todos los
+    ids y no escala a promociones de todo el catálogo. Devuelve si hubo cambios.
+    """
+    Enlace = Promocion.productos.through
+    enlaces = Enlace.objects.filter(promocion_id=promocion.pk)
+    actuales = set() if nueva else set(enlaces.values_list('producto_id', flat=True))
+    quitar = actuales.difference(ids)
+    for lote in lotes_de_ids(sorted(quitar)):
+        enlaces.filter(producto_id__in=lote).delete()
+    nuevos = [producto_id for producto_id in ids if producto_id not in actuales]
+    Enlace.objects.bulk_create(
+        [Enlace(promocion_id=promocion.pk, producto_id=producto_id) for producto_id in nuevos], batch_size=1000
+    )
+    return bool(quitar or nuevos)
+
 
 # Añade esto al final de serializers.py
 class PromocionSerializer(serializers.ModelSerializer):
-    productos = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Producto.objects.all(),
-        required=True  # Asegura que el campo sea obligatorio
-    )
+    productos = ProductosPorLoteField(required=True)
+    imagen = serializers.ImageField(required=False, allow_null=True)
+    imagenes = serializers.SerializerMethodField()
 
     class Meta:
         model = Promocion
-        fields = ['id', 'nombre', 'descripcion', 'descuento', 'productos', 'fecha_inicio', 'fecha_fin', 'estado']
\ No newline at end of file
+        fields = [
+            'id', 'nombre', 'descripcion', 'descuento', 'productos', 'fecha_inicio', 'fecha_fin', 'estado',
+            'imagen', 'imagenes',
+        ]
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        # Los solapamientos no impiden guardar: se devuelven como aviso en ``conflictos``
+        self._conflictos = []
+        estado = attrs.get('estado', getattr(self.instance, 'estado', 'ACTIVA'))
+        if estado != 'ACTIVA' or attrs.get('productos') == []:
+            return attrs
+        if 'productos' in attrs:
+            productos = attrs['productos']
+        elif self.instance is None:
+            return attrs
+        else:
+            # PATCH sin productos: los que ya tiene, como subconsulta
+            productos = Promocion.productos.through.objects.filter(
+                promocion_id=self.instance.pk
+            ).values('producto_id')
+        self._conflictos = conflictos_promocion(
+            attrs.get('fecha_inicio', getattr(self.instance, 'fecha_inicio', None)),
+            attrs.get('fecha_fin', getattr(self.instance, 'fecha_fin', None)),
+            productos,
+            excluir=getattr(self.instance, 'pk', None),
+        )
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        from .signals import notificar_cambio_menu
+        productos = validated_data.pop('productos')
+        promocion = super().create(validated_data)
+        # Los INSERT masivos no disparan m2m_changed
+        if enlazar_productos(promocion, productos, nueva=True):
+            notificar_cambio_menu(Promocion, [promocion.pk])
+        return promocion
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        from .signals import notificar_cambio_menu
+        productos = validated_data.pop('productos', None)
+        promocion = super().update(instance, validated_data)
+        if productos is not None and enlazar_productos(promocion, productos):
+            notificar_cambio_menu(Promocion, [promocion.pk])
+        return promocion
+
+    def to_representation(self, instance):
+        datos = super().to_representation(instance)
+        if hasattr(self, '_conflictos'):
+            datos['conflictos'] = self._conflictos
+        return datos
+
+    def get_imagenes(self, obj):
+        return urls_imagen(obj, self.context.get('request'))
+
+# Lectura rápida de listados: parte de filas de .values() en vez de instancias
+# y produce exactamente lo mismo que ProductoSerializer/PromocionSerializer.
+# Decimales y fechas se formatean con los propios campos del serializer.
+CAMPOS_PRODUCTO = ('id', 'categoria', 'nombre', 'descripcion', 'precio', 'estado')
+CAMPOS_PROMOCION = (
+    'id', 'nombre', 'descripcion', 'descuento', 'fecha_inicio', 'fecha_fin', 'estado',
+    'imagen', 'imagen_hash', 'imagen_lista',
+)
+NOMBRES_CATEGORIA = dict(Producto.CATEGORIA_CHOICES)
+NOMBRES_ESTADO_PRODUCTO = dict(Producto.ESTADO_CHOICES)
+
+
+def productos_a_datos(filas):
+    precio = ProductoSerializer().fields['precio'].to_representation
+    return [
+        {
+            'id': fila['id'],
+            'categoria_nombre': NOMBRES_CATEGORIA.get(fila['categoria'], fila['categoria']),
+            'estado_nombre': NOMBRES_ESTADO_PRODUCTO.get(fila['estado'], fila['estado']),
+            'categoria': fila['categoria'],
+            'nombre': fila['nombre'],
+            'descripcion': fila['descripcion'],
+            'precio': precio(fila['precio']),
+            'estado': fila['estado'],
+        }
+        for fila in filas
+    ]
+
+
+def promociones_a_datos(filas, request=None):
+    filas = list(filas)
+    campos = PromocionSerializer().fields
+    descuento = campos['descuento'].to_representation
+    fecha = campos['fecha_inicio'].to_representation
+
+    # Una consulta a la tabla intermedia (por lote de IN) para los productos de todas las filas
+    productos = {fila['id']: [] for fila in filas}
+    for lote in lotes_de_ids(productos):
+        enlaces = Promocion.productos.through.objects.filter(promocion_id__in=lote)
+        for promocion_id, producto_id in enlaces.order_by('promocion_id', 'producto_id').values_list(
+            'promocion_id', 'producto_id'
+        ):
+            productos[promocion_id].append(producto_id)
+
+    datos = []
+    for fila in filas:
+        imagen = None
+        if fila['imagen']:
+            imagen = default_storage.url(fila['imagen'])
+            if request is not None:
+                imagen = request.build_absolute_uri(imagen)
+        datos.append({
+            'id': fila['id'],
+            'nombre': fila['nombre'],
+            'descripcion': fila['descripcion'],
+            'descuento': descuento(fila['descuento']),
+            'productos': productos[fila['id']],
+            'fecha_inicio': fecha(fila['fecha_inicio']),
+            'fecha_fin': fecha(fila['fecha_fin']),
+            'estado': fila['estado'],
+            'imagen': imagen,
+            'imagenes': urls_rendiciones(fila['imagen'], fila['imagen_hash'], fila['imagen_lista'], request),
+        })
+    return datos
+
+class PrecioVigenteSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='producto_id', read_only=True)
+    nombre = serializers.CharField(source='producto.nombre', read_only=True)
+    descripcion = serializers.CharField(source='producto.descripcion', read_only=True)
+    categoria = serializers.CharField(source='producto.categoria', read_only=True)
+    categoria_nombre = serializers.CharField(source='producto.get_categoria_display', read_only=True)
+    estado = serializers.CharField(source='producto.estado', read_only=True)
+    estado_nombre = serializers.CharField(source='producto.get_estado_display', read_only=True)
+
+    class Meta:
+        model = PrecioVigente
+        fields = [
+            'id', 'nombre', 'descripcion', 'categoria', 'categoria_nombre', 'estado', 'estado_nombre',
+            'precio', 'descuento', 'precio_final', 'promocion', 'fecha',
+        ]
+
+
+class LineaPedidoSerializer(serializers.ModelSerializer):
+    # IntegerField en lugar de PrimaryKeyRelatedField: los ids se validan todos juntos en PedidoSerializer
+    producto = serializers.IntegerField(source='producto_id')
+    producto_nombre = serializers.CharField(source='producto.nombre', read_only=True)
+    precio_unitario = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    class Meta:
+        model = LineaPedido
+        fields = ['id', 'producto', 'producto_nombre', 'cantidad', 'precio_unitario', 'notas']
+
+class PedidoSerializer(serializers.ModelSerializer):
+    lineas = LineaPedidoSerializer(many=True)
+    estado_nombre = serializers.CharField(source='get_estado_display', read_only=True)
+
+    class Meta:
+        model = Pedido
+        fields = ['id', 'mesa', 'mesero', 'estado', 'estado_nombre', 'total', 'notas', 'creado_en', 'lineas']
+        read_only_fields = ['mesero', 'estado', 'total', 'creado_en']
+
+    def validate_lineas(self, lineas):
+        if not lineas:
+            raise serializers.ValidationError('El pedido debe tener al menos una línea.')
+
+        # Una sola consulta para todos los productos y su precio vigente
+        hoy = timezone.now().date()
+        ids = {linea['producto_id'] for linea in lineas}
+        productos = Producto.objects.select_related('precio_vigente').in_bulk(ids)
+        precios = {}
+        for producto in productos.values():
+            vigente = getattr(producto, 'precio_vigente', None)
+            if vigente is not None and vigente.fecha == hoy:
+                precios[producto.id] = vigente.precio_final
+        sin_precio = [producto_id for producto_id in productos if producto_id not in precios]
+        if sin_precio:
+            precios.update({p.producto_id: p.precio_final for p in calcular_precios(hoy, sin_precio)})
+
+        errores = []
+        for linea in lineas:
+            producto = productos.get(linea['producto_id'])
+            error = {}
+            if producto is None:
+                error['producto'] = ['Producto no encontrado.']
+            elif producto.estado != 'DISPONIBLE':
+                error['producto'] = [f'{producto.nombre} está fuera de stock.']
+            elif 'precio_unitario' in linea and linea['precio_unitario'] != precios[producto.id]:
+                error['precio_unitario'] = [f'El precio de {producto.nombre} cambió a {precios[producto.id]}.']
+            else:
+                linea['producto'] = producto
+                linea['precio_unitario'] = precios[producto.id]
+            errores.append(error)
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        return lineas
+
+    def create(self, validated_data):
+        lineas = validated_data.pop('lineas')
+        total = sum(linea['precio_unitario'] * linea['cantidad'] for linea in lineas)
+        with transaction.atomic():
+            pedido = Pedido.objects.create(total=total, **validated_data)
+            objetos = LineaPedido.objects.bulk_create([
+                LineaPedido(pedido=pedido, **linea) for linea in lineas
+            ])
+        # La respuesta usa las líneas en memoria, sin volver a consultarlas
+        pedido._prefetched_objects_cache = {'lineas': objetos}
+        return pedido
+
+class PedidoEstadoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Pedido
+        fields = ['id', 'estado']
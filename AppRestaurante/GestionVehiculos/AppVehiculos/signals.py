@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from .cache import invalidar_menu
+from .imagenes import encolar_imagen, guardar_original
+from .authentication import clave_empleado
+from .models import Empleado, EventoMenu, Producto, Promocion
+from .pricing import productos_de_promociones, refrescar_precios
+from .search import indexar_productos
+from .snapshots import programar_publicacion
+
+# Se envía ante cualquier cambio del menú, incluidas las operaciones masivas
+# que no disparan post_save. Argumentos: ids, accion.
+menu_cambiado = Signal()
+
+
+def notificar_cambio_menu(modelo, ids, accion='actualizado'):
+    menu_cambiado.send(sender=modelo, ids=list(ids), accion=accion)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Promocion)
+def _menu_guardado(sender, instance, created, **kwargs):
+    notificar_cambio_menu(sender, [instance.pk], 'creado' if created else 'actualizado')
+
+
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=Promocion)
+def _menu_eliminado(sender, instance, **kwargs):
+    notificar_cambio_menu(sender, [instance.pk], 'eliminado')
+
+
+@receiver(pre_save, sender=Promocion)
+def _guardar_imagen_promocion(sender, instance, **kwargs):
+    imagen = instance.imagen
+    if not imagen:
+        instance.imagen_hash, instance.imagen_lista = '', False
+        return
+    if imagen._committed:
+        return
+    # Subida nueva: se guarda bajo su sha256 en vez del nombre del cliente
+    hash_imagen, nombre = guardar_original(imagen.file)
+    imagen.name, imagen._committed = nombre, True
+    instance.imagen_hash = hash_imagen
+    instance.imagen_lista = Promocion.objects.filter(imagen_hash=hash_imagen, imagen_lista=True).exists()
+    if not instance.imagen_lista:
+        instance._imagen_pendiente = True
+
+
+@receiver(post_save, sender=Promocion)
+def _procesar_imagen_promocion(sender, instance, **kwargs):
+    if instance.__dict__.pop('_imagen_pendiente', False):
+        hash_imagen, nombre = instance.imagen_hash, instance.imagen.name
+        transaction.on_commit(lambda: encolar_imagen(hash_imagen, nombre))
+
+
+@receiver(m2m_changed, sender=Promocion.productos.through)
+def _productos_promocion_cambiados(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # Cambio hecho desde producto.promociones: pk_set son promociones
+        if pk_set:
+            notificar_cambio_menu(Promocion, pk_set)
+    else:
+        notificar_cambio_menu(Promocion, [instance.pk])
+
+
+def registrar_evento(modelo, accion, ids):
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Serializa las inserciones para que los ids se confirmen en orden: si no,
+            # un id menor confirmado después quedaría detrás de un Last-Event-ID.
+            # En SQLite las escrituras ya están serializadas.
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(EventoMenu._meta.db_table)} '
+                               'IN SHARE ROW EXCLUSIVE MODE')
+        EventoMenu.objects.create(modelo=modelo, accion=accion, ids=ids)
+
+
+# Conectado antes que _invalidar_cache_menu: los on_commit se ejecutan en orden de
+# registro y el evento debe existir cuando los clientes SSE vean la versión nueva
+@receiver(menu_cambiado)
+def _registrar_evento_menu(sender, ids, accion, **kwargs):
+    # Un evento por cambio (aunque sea masivo), insertado tras el commit del cambio:
+    # el id del evento sigue el orden de confirmación y no el de inicio de la transacción
+    modelo, ids = sender._meta.model_name, sorted(ids)
+    transaction.on_commit(lambda: registrar_evento(modelo, accion, ids))
+
+
+@receiver(menu_cambiado)
+def _invalidar_cache_menu(sender, **kwargs):
+    invalidar_menu()
+    # Segunda invalidación al confirmar, por si una lectura concurrente
+    # guardó en caché datos previos al commit
+    transaction.on_commit(invalidar_menu)
+
+
+@receiver(menu_cambiado)
+def _refrescar_precios_vigentes(sender, ids, accion, **kwargs):
+    if sender is Producto:
+        if accion != 'eliminado':
+            refrescar_precios(ids)
+    elif sender is Promocion:
+        producto_ids = productos_de_promociones(ids)
+        if producto_ids:
+            refrescar_precios(producto_ids)
+
+
+@receiver(menu_cambiado)
+def _indexar_busqueda(sender, ids, **kwargs):
+    # Al eliminar, el producto ya no existe y solo se borra su fila del índice
+    if sender is Producto:
+        indexar_productos(ids)
+
+
+@receiver(menu_cambiado)
+def _publicar_snapshot_menu(sender, **kwargs):
+    # Solo con MENU_SNAPSHOT_DIR configurado; se publica lo ya confirmado
+    if getattr(settings, 'MENU_SNAPSHOT_DIR', None):
+        transaction.on_commit(programar_publicacion)
+
+
+@receiver(post_save, sender=Empleado)
+@receiver(post_delete, sender=Empleado)
+def _invalidar_empleado(sender, instance, **kwargs):
+    cache.delete(clave_empleado(instance.pk))
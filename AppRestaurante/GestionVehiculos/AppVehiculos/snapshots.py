@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Producto, Promocion
+from .renderers import ORJSONRenderer
+from .serializers import CAMPOS_PRODUCTO, CAMPOS_PROMOCION, productos_a_datos, promociones_a_datos
+
+logger = logging.getLogger(__name__)
+
+MANIFIESTO = 'manifest.json'
+NOMBRE_ESTABLE = 'menu.json'
+
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot-menu')
+_lock = threading.Lock()
+_en_cola = False
+
+
+def construir_menu():
+    """Menú público completo: productos con sus etiquetas y promociones con sus productos."""
+    return {
+        'categorias': [{'valor': valor, 'nombre': nombre} for valor, nombre in Producto.CATEGORIA_CHOICES],
+        'productos': productos_a_datos(Producto.objects.order_by('id').values(*CAMPOS_PRODUCTO)),
+        'promociones': promociones_a_datos(Promocion.objects.order_by('id').values(*CAMPOS_PROMOCION)),
+    }
+
+
+def escribir_atomico(ruta, contenido):
+    # Fichero temporal en el mismo directorio + os.replace: el servidor estático
+    # nunca ve un fichero a medio escribir
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=f'.{ruta.name}.')
+    try:
+        with os.fdopen(descriptor, 'wb') as fichero:
+            fichero.write(contenido)
+            fichero.flush()
+            os.fsync(fichero.fileno())
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+def leer_manifiesto(directorio):
+    try:
+        return json.loads((Path(directorio) / MANIFIESTO).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def publicar_menu(directorio=None, forzar=False):
+    """Escribe el menú en ``directorio`` como ficheros versionados y precomprimidos.
+
+    Genera ``menu-<version>.json`` (y ``.gz``), la copia estable ``menu.json``
+    (y ``.gz``, para ``gzip_static``) y por último ``manifest.json``. Si el
+    contenido no cambió no se reescribe nada. Devuelve el manifiesto.
+    """
+    directorio = Path(directorio or settings.MENU_SNAPSHOT_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    menu = construir_menu()
+    contenido = ORJSONRenderer().render(menu)
+    version = hashlib.sha256(contenido).hexdigest()[:16]
+    actual = leer_manifiesto(directorio)
+    if actual and actual.get('version') == version and not forzar:
+        return actual
+
+    comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+    archivo = f'menu-{version}.json'
+    for nombre in (archivo, NOMBRE_ESTABLE):
+        escribir_atomico(directorio / nombre, contenido)
+        escribir_atomico(directorio / f'{nombre}.gz', comprimido)
+
+    manifiesto = {
+        'version': version,
+        'generado': timezone.now().isoformat(),
+        'archivo': archivo,
+        'gzip': f'{archivo}.gz',
+        'bytes': len(contenido),
+        'bytes_gzip': len(comprimido),
+        'sha256': hashlib.sha256(contenido).hexdigest(),
+        'productos': len(menu['productos']),
+        'promociones': len(menu['promociones']),
+        'anteriores': ([actual['archivo']] + actual.get('anteriores', []) if actual else []),
+    }
+    conservar = getattr(settings, 'MENU_SNAPSHOT_CONSERVAR', 5)
+    anteriores = [nombre for nombre in manifiesto['anteriores'] if nombre != archivo]
+    manifiesto['anteriores'] = anteriores[:conservar]
+    escribir_atomico(directorio / MANIFIESTO, json.dumps(manifiesto, indent=2).encode())
+
+    # Las versiones viejas se borran después del manifiesto: un cliente con el
+    # manifiesto anterior aún encuentra su fichero durante el cambio
+    for nombre in anteriores[conservar:]:
+        for ruta in (directorio / nombre, directorio / f'{nombre}.gz'):
+            ruta.unlink(missing_ok=True)
+    return manifiesto
+
+
+def _publicar_en_segundo_plano():
+    global _en_cola
+    with _lock:
+        # Los cambios confirmados a partir de aquí programan otra publicación
+        _en_cola = False
+    try:
+        publicar_menu()
+    except Exception:
+        logger.exception('No se pudo publicar el snapshot del menú')
+    finally:
+        connection.close()
+
+
+def programar_publicacion():
+    """Publica tras un cambio; varias llamadas seguidas se agrupan en una sola publicación."""
+    global _en_cola
+    if getattr(settings, 'MENU_SNAPSHOT_SINCRONO', False):
+        publicar_menu()
+        return
+    with _lock:
+        if _en_cola:
+            return
+        _en_cola = True
+    _pool.submit(_publicar_en_segundo_plano)
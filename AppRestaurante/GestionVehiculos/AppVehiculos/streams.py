@@ -0,0 +1,120 @@
+import asyncio
+import json
+import re
+import time
+import zlib
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import HttpResponseNotAllowed, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .cache import aversion_menu
+from .models import EventoMenu
+from .renderers import ORJSONRenderer
+
+LOTE_EVENTOS = 500
+
+
+def formatear_evento(evento):
+    datos = json.dumps({'accion': evento.accion, 'ids': evento.ids}, separators=(',', ':'))
+    return f'id: {evento.id}\nevent: {evento.modelo}\ndata: {datos}\n\n'
+
+
+async def eventos_pendientes(ultimo_id):
+    return [evento async for evento in EventoMenu.objects.filter(id__gt=ultimo_id).order_by('id')[:LOTE_EVENTOS]]
+
+
+async def flujo_eventos(ultimo_id):
+    """Generador SSE de cambios del menú posteriores a ``ultimo_id``.
+
+    Solo consulta la tabla de eventos cuando cambia la versión del menú en la
+    caché (o cada SSE_INTERVALO_MAXIMO segundos si la caché no es compartida
+    entre procesos). La conexión se cierra tras SSE_DURACION_MAXIMA segundos
+    y el navegador se reconecta enviando Last-Event-ID.
+    """
+    intervalo = getattr(settings, 'SSE_INTERVALO', 1)
+    intervalo_maximo = getattr(settings, 'SSE_INTERVALO_MAXIMO', 15)
+    duracion_maxima = getattr(settings, 'SSE_DURACION_MAXIMA', 300)
+
+    yield f'retry: {intervalo_maximo * 1000}\n\n'
+    inicio = ultima_consulta = time.monotonic()
+    version = None
+    while time.monotonic() - inicio < duracion_maxima:
+        version_actual = await aversion_menu()
+        if version_actual != version or time.monotonic() - ultima_consulta >= intervalo_maximo:
+            version = version_actual
+            ultima_consulta = time.monotonic()
+            eventos = await eventos_pendientes(ultimo_id)
+            for evento in eventos:
+                ultimo_id = evento.id
+                yield formatear_evento(evento)
+            if not eventos:
+                yield ': ping\n\n'
+            if len(eventos) == LOTE_EVENTOS:
+                continue
+        await asyncio.sleep(intervalo)
+
+
+async def eventos_menu(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    ultimo = request.headers.get('Last-Event-ID') or request.GET.get('ultimo_evento')
+    if ultimo and ultimo.isdigit():
+        ultimo_id = int(ultimo)
+    else:
+        # Conexión nueva: solo cambios a partir de ahora
+        ultimo_id = (await EventoMenu.objects.aaggregate(maximo=Max('id')))['maximo'] or 0
+
+    response = StreamingHttpResponse(flujo_eventos(ultimo_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Listados completos en streaming (?stream=1): memoria constante sea cual sea
+# el tamaño del catálogo. El JSON resultante es el mismo que el de la vista.
+
+def json_por_lotes(queryset, convertir, tamano_lote):
+    """Itera ``queryset`` por lotes y emite una lista JSON por fragmentos.
+
+    ``convertir`` recibe cada lote de filas y devuelve sus dicts serializados.
+    """
+    renderer = ORJSONRenderer()
+    yield b'['
+    separador = b''
+    lote = []
+    for fila in queryset.iterator(chunk_size=tamano_lote):
+        lote.append(fila)
+        if len(lote) == tamano_lote:
+            yield separador + renderer.render(convertir(lote))[1:-1]
+            separador, lote = b',', []
+    if lote:
+        yield separador + renderer.render(convertir(lote))[1:-1]
+    yield b']'
+
+
+def comprimir(fragmentos):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for fragmento in fragmentos:
+        datos = compresor.compress(fragmento)
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+def acepta_gzip(request):
+    return bool(re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')))
+
+
+def respuesta_json_en_streaming(request, queryset, convertir):
+    tamano_lote = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+    fragmentos = json_por_lotes(queryset, convertir, tamano_lote)
+    usar_gzip = getattr(settings, 'STREAM_GZIP', True) and acepta_gzip(request)
+    response = StreamingHttpResponse(comprimir(fragmentos) if usar_gzip else fragmentos,
+                                     content_type='application/json')
+    if usar_gzip:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
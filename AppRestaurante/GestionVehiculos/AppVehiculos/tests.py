@@ -1,10 +1,43 @@
 from django.urls import reverse
+from django.test import TestCase, TransactionTestCase, override_settings
+import json
+from unittest import mock
+from asgiref.sync import sync_to_async
 from rest_framework import status
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.test import APITestCase, APITransactionTestCase, APIClient
 from django.contrib.auth.models import User
-from .models import Empleado, Producto, Promocion
+from .models import Empleado, EventoMenu, LineaPedido, Pedido, PrecioVigente, Producto, Promocion
+from .signals import notificar_cambio_menu
+from .cache import invalidar_menu
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from django.core.management import CommandError, call_command
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from .tokens import revocados
+from django.test.utils import CaptureQueriesContext
+import os
+import time
+import tempfile
+import shutil
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from .imagenes import RENDICIONES, ruta_rendicion
+from .metrics import metricas
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from .serializers import (
+    CAMPOS_PRODUCTO, CAMPOS_PROMOCION, ProductoSerializer, PromocionSerializer,
+    productos_a_datos, promociones_a_datos,
+)
+from .views import promociones_con_productos
+import gzip
+from unittest import skipUnless
+from .renderers import ORJSONRenderer, msgpack
 
 class EmpleadoTests(APITestCase):
     def setUp(self):
@@ -214,6 +247,49 @@ class ProductoTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(Producto.objects.count(), 2)
 
+    def test_filtrar_productos_por_categoria_y_estado(self):
+        url = reverse('producto-list')
+        response = self.anon_client.get(url, {'categoria': 'BEBIDA'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['nombre'] for p in response.data], ['Producto 2'])
+
+        response = self.anon_client.get(url, {'estado': 'DISPONIBLE'})
+        self.assertEqual([p['nombre'] for p in response.data], ['Producto 1'])
+
+        response = self.anon_client.get(url, {'categoria': 'BEBIDA', 'estado': 'DISPONIBLE'})
+        self.assertEqual(response.data, [])
+
+    def test_paginacion_por_cursor(self):
+        for i in range(3, 6):
+            Producto.objects.create(
+                nombre=f'Producto {i}',
+                categoria='ENTRADA',
+                descripcion=f'Descripción {i}',
+                precio=3.50,
+            )
+        url = reverse('producto-list')
+        response = self.anon_client.get(url, {'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Producto 1', 'Producto 2'])
+        self.assertIsNone(response.data['previous'])
+
+        nombres = []
+        siguiente = response.data['next']
+        while siguiente:
+            response = self.anon_client.get(siguiente)
+            nombres += [p['nombre'] for p in response.data['results']]
+            siguiente = response.data['next']
+        self.assertEqual(nombres, ['Producto 3', 'Producto 4', 'Producto 5'])
+
+    def test_paginacion_respeta_filtros(self):
+        url = reverse('producto-list')
+        response = self.anon_client.get(url, {'page_size': 10, 'estado': 'FUERA_STOCK'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['nombre'] for p in response.data['results']], ['Producto 2'])
+        self.assertIsNone(response.data['next'])
+
 
 class PromocionTests(APITestCase):
     def setUp(self):
@@ -384,4 +460,1506 @@ class PromocionTests(APITestCase):
         self.promocion.fecha_inicio = timezone.now().date()
         self.promocion.fecha_fin = timezone.now().date() - timedelta(days=1)
         self.promocion.save()
-        self.assertFalse(self.promocion.esta_activa())
\ No newline at end of file
+        self.assertFalse(self.promocion.esta_activa())
+
+    def _crear_promociones(self, cantidad):
+        for i in range(cantidad):
+            promocion = Promocion.objects.create(
+                nombre=f'Promoción extra {i}',
+                descripcion='Descripción',
+                descuento=5.00,
+                fecha_inicio=timezone.now().date(),
+                fecha_fin=timezone.now().date() + timedelta(days=7),
+            )
+            promocion.productos.add(self.producto1, self.producto2)
+
+    def test_listar_promociones_consultas_constantes(self):
+        url = reverse('promocion-list')
+        with self.assertNumQueries(2):
+            response = self.anon_client.get(url)
+        self.assertEqual(len(response.data), 1)
+
+        self._crear_promociones(10)
+        with self.assertNumQueries(2):
+            response = self.anon_client.get(url)
+        self.assertEqual(len(response.data), 11)
+        self.assertEqual(response.data[-1]['productos'], [self.producto1.id, self.producto2.id])
+
+    def test_paginacion_promociones(self):
+        self._crear_promociones(4)
+        url = reverse('promocion-list')
+        with self.assertNumQueries(2):
+            response = self.anon_client.get(url, {'page_size': 3})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['nombre'], 'Promoción Test')
+
+        response = self.anon_client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+
+class MenuCacheTests(APITestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            nombre='Producto 1',
+            categoria='PLATO_PRINCIPAL',
+            descripcion='Descripción 1',
+            precio=10.99,
+        )
+        self.promocion = Promocion.objects.create(
+            nombre='Promoción Test',
+            descripcion='Descripción promoción',
+            descuento=10.00,
+            fecha_inicio=timezone.now().date(),
+            fecha_fin=timezone.now().date() + timedelta(days=7),
+        )
+        self.client = APIClient()
+
+    def test_lectura_en_cache_no_consulta_la_base(self):
+        for url in (reverse('producto-list'), reverse('promocion-list'),
+                    reverse('promocion-detail', args=[self.promocion.id])):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_guardar_producto_invalida_cache(self):
+        url = reverse('producto-list')
+        self.client.get(url)
+        self.producto.estado = 'FUERA_STOCK'
+        self.producto.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]['estado'], 'FUERA_STOCK')
+
+    def test_cambio_m2m_invalida_cache(self):
+        url = reverse('promocion-detail', args=[self.promocion.id])
+        self.assertEqual(self.client.get(url).data['productos'], [])
+
+        self.promocion.productos.add(self.producto)
+        self.assertEqual(self.client.get(url).data['productos'], [self.producto.id])
+
+    def test_eliminar_promocion_invalida_cache(self):
+        url = reverse('promocion-list')
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+        self.promocion.delete()
+        self.assertEqual(self.client.get(url).data, [])
+
+    def test_cache_separada_por_host(self):
+        Promocion.objects.filter(pk=self.promocion.pk).update(
+            imagen='promociones/originales/a.png', imagen_hash='a' * 64, imagen_lista=True
+        )
+        url = reverse('promocion-detail', args=[self.promocion.id])
+        interna = self.client.get(url, HTTP_HOST='interno:8000').data
+        publica = self.client.get(url, HTTP_HOST='publico.example.com').data
+        self.assertTrue(interna['imagenes']['card'].startswith('http://interno:8000/'))
+        self.assertTrue(publica['imagenes']['card'].startswith('http://publico.example.com/'))
+
+
+class MenuPreciosTests(APITestCase):
+    def setUp(self):
+        self.hoy = timezone.now().date()
+        self.producto1 = Producto.objects.create(
+            nombre='Producto 1',
+            categoria='PLATO_PRINCIPAL',
+            descripcion='Descripción 1',
+            precio='20.00',
+        )
+        self.producto2 = Producto.objects.create(
+            nombre='Producto 2',
+            categoria='BEBIDA',
+            descripcion='Descripción 2',
+            precio='5.99',
+        )
+        self.promo10 = self._crear_promocion('Promo 10', '10.00', self.hoy, self.hoy + timedelta(days=7))
+        self.promo25 = self._crear_promocion('Promo 25', '25.00', self.hoy + timedelta(days=1), self.hoy + timedelta(days=7))
+        self.promo10.productos.add(self.producto1, self.producto2)
+        self.promo25.productos.add(self.producto1)
+        self.client = APIClient()
+
+    def _crear_promocion(self, nombre, descuento, inicio, fin):
+        return Promocion.objects.create(
+            nombre=nombre,
+            descripcion='Descripción',
+            descuento=descuento,
+            fecha_inicio=inicio,
+            fecha_fin=fin,
+        )
+
+    def _menu(self, **params):
+        response = self.client.get(reverse('menu'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item['id']: item for item in response.data}
+
+    def test_menu_aplica_mejor_descuento_vigente(self):
+        menu = self._menu()
+        self.assertEqual(menu[self.producto1.id]['precio_final'], '18.00')
+        self.assertEqual(menu[self.producto1.id]['promocion'], self.promo10.id)
+        self.assertEqual(menu[self.producto2.id]['precio_final'], '5.39')
+        self.assertEqual(menu[self.producto1.id]['categoria_nombre'], 'Plato Principal')
+
+    def test_menu_para_otra_fecha(self):
+        menu = self._menu(fecha=(self.hoy + timedelta(days=2)).isoformat())
+        self.assertEqual(menu[self.producto1.id]['precio_final'], '15.00')
+        self.assertEqual(menu[self.producto1.id]['promocion'], self.promo25.id)
+
+    def test_precios_se_actualizan_de_forma_incremental(self):
+        self.promo25.fecha_inicio = self.hoy
+        self.promo25.save()
+        self.assertEqual(PrecioVigente.objects.get(producto=self.producto1).precio_final, Decimal('15.00'))
+
+        self.promo25.productos.remove(self.producto1)
+        self.assertEqual(PrecioVigente.objects.get(producto=self.producto1).precio_final, Decimal('18.00'))
+
+        self.promo10.delete()
+        precio = PrecioVigente.objects.get(producto=self.producto1)
+        self.assertEqual(precio.precio_final, Decimal('20.00'))
+        self.assertIsNone(precio.promocion_id)
+
+        self.producto2.precio = '10.00'
+        self.producto2.save()
+        self.assertEqual(PrecioVigente.objects.get(producto=self.producto2).precio_final, Decimal('10.00'))
+
+    def test_menu_lee_tabla_materializada(self):
+        self._menu()
+        invalidar_menu()
+        # Comprobación de vigencia + lectura de la tabla materializada
+        with self.assertNumQueries(2):
+            menu = self._menu()
+        self.assertEqual(len(menu), 2)
+
+
+class ProductoBulkTests(APITestCase):
+    def setUp(self):
+        self.admin = Empleado.objects.create_user(
+            username='admin',
+            password='admin123',
+            tipo_empleado='ADM',
+            email='admin@test.com'
+        )
+        self.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', categoria='BEBIDA', descripcion='Descripción', precio='2.00')
+            for i in range(3)
+        ])
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(user=self.admin)
+        self.url = reverse('producto-bulk')
+
+    def test_operaciones_masivas(self):
+        p0, p1, p2 = self.productos
+        data = [
+            {'op': 'create', 'nombre': 'Nuevo', 'categoria': 'POSTRE', 'descripcion': 'Postre', 'precio': '4.50'},
+            {'op': 'update', 'id': p0.id, 'precio': '3.00'},
+            {'op': 'update', 'id': p1.id, 'estado': 'FUERA_STOCK', 'nombre': 'Renombrado'},
+            {'op': 'toggle', 'id': p2.id},
+        ]
+        response = self.admin_client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['creados']), 1)
+        self.assertEqual(response.data['actualizados'], 2)
+        self.assertEqual(response.data['alternados'], 1)
+        self.assertEqual(Producto.objects.get(pk=response.data['creados'][0]).nombre, 'Nuevo')
+        p0.refresh_from_db()
+        p1.refresh_from_db()
+        p2.refresh_from_db()
+        self.assertEqual(p0.precio, Decimal('3.00'))
+        self.assertEqual((p1.nombre, p1.estado), ('Renombrado', 'FUERA_STOCK'))
+        self.assertEqual(p2.estado, 'FUERA_STOCK')
+        self.assertEqual(PrecioVigente.objects.get(producto=p0).precio_final, Decimal('3.00'))
+
+    def test_ids_repetidos_cuentan_una_fila(self):
+        p0 = self.productos[0]
+        data = [
+            {'op': 'update', 'id': p0.id, 'precio': '3.00'},
+            {'op': 'update', 'id': p0.id, 'nombre': 'Repetido'},
+            {'op': 'update', 'id': self.productos[1].id, 'precio': '5.00'},
+        ]
+        response = self.admin_client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['actualizados'], 2)
+
+    def test_errores_por_elemento_no_aplican_cambios(self):
+        data = [
+            {'op': 'create', 'nombre': 'Sin precio', 'categoria': 'POSTRE', 'descripcion': 'Postre'},
+            {'op': 'update', 'id': self.productos[0].id, 'precio': '3.00'},
+            {'op': 'update', 'id': 999999, 'precio': '3.00'},
+            {'op': 'borrar', 'id': self.productos[1].id},
+            {'op': 'update', 'id': self.productos[1].id, 'categoria': 'NO_EXISTE'},
+        ]
+        response = self.admin_client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errores = {e['indice']: e['errores'] for e in response.data['errores']}
+        self.assertEqual(sorted(errores), [0, 2, 3, 4])
+        self.assertIn('precio', errores[0])
+        self.assertIn('id', errores[2])
+        self.assertIn('op', errores[3])
+        self.assertIn('categoria', errores[4])
+        self.assertEqual(Producto.objects.count(), 3)
+        self.assertFalse(Producto.objects.filter(precio='3.00').exists())
+
+    def test_miles_de_filas_en_pocas_consultas(self):
+        data = [
+            {'op': 'create', 'nombre': f'Masivo {i}', 'categoria': 'ENTRADA', 'descripcion': 'x', 'precio': '1.00'}
+            for i in range(2000)
+        ]
+        data += [{'op': 'toggle', 'id': producto.id} for producto in self.productos]
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.admin_client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Producto.objects.count(), 2003)
+        # Los INSERT se agrupan por lotes (en SQLite el lote lo limita el máximo de parámetros)
+        self.assertLess(len(consultas), 50)
+        self.assertEqual(Producto.objects.filter(estado='FUERA_STOCK').count(), 3)
+
+
+class ToggleEstadoTests(APITestCase):
+    def setUp(self):
+        self.admin = Empleado.objects.create_user(
+            username='admin',
+            password='admin123',
+            tipo_empleado='ADM',
+            email='admin@test.com'
+        )
+        self.bebidas = [
+            Producto.objects.create(nombre=f'Bebida {i}', categoria='BEBIDA', descripcion='x', precio='2.00')
+            for i in range(3)
+        ]
+        self.bebidas[0].estado = 'FUERA_STOCK'
+        self.bebidas[0].save()
+        self.postre = Producto.objects.create(nombre='Postre', categoria='POSTRE', descripcion='x', precio='3.00')
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(user=self.admin)
+
+    def test_toggle_en_una_sentencia(self):
+        url = reverse('producto-detail', args=[self.postre.id])
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.admin_client.patch(url, {'estado': 'toggle'}, format='json')
+
+        self.assertEqual(response.data['nuevo_estado'], 'Fuera de Stock')
+        actualizaciones = [q['sql'] for q in consultas if q['sql'].startswith('UPDATE "AppVehiculos_producto"')]
+        self.assertEqual(len(actualizaciones), 1)
+        self.assertIn('CASE WHEN', actualizaciones[0])
+
+    def test_toggle_producto_inexistente(self):
+        url = reverse('producto-detail', args=[999999])
+        response = self.admin_client.patch(url, {'estado': 'toggle'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_toggle_por_categoria(self):
+        response = self.admin_client.patch(
+            reverse('producto-list') + '?categoria=BEBIDA', {'estado': 'toggle'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['actualizados'], 3)
+        estados = [p.estado for p in Producto.objects.filter(categoria='BEBIDA').order_by('id')]
+        self.assertEqual(estados, ['DISPONIBLE', 'FUERA_STOCK', 'FUERA_STOCK'])
+        self.assertEqual(Producto.objects.get(pk=self.postre.pk).estado, 'DISPONIBLE')
+
+    def test_marcar_categoria_fuera_de_stock(self):
+        response = self.admin_client.patch(
+            reverse('producto-list'), {'categoria': 'BEBIDA', 'estado': 'FUERA_STOCK'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Producto.objects.filter(categoria='BEBIDA', estado='DISPONIBLE').exists())
+
+    def test_toggle_por_categoria_invalida(self):
+        response = self.admin_client.patch(reverse('producto-list'), {'estado': 'toggle'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ToggleEstadoConcurrenteTests(APITransactionTestCase):
+    def setUp(self):
+        self.admin = Empleado.objects.create_user(
+            username='admin',
+            password='admin123',
+            tipo_empleado='ADM',
+            email='admin@test.com'
+        )
+        self.producto = Producto.objects.create(
+            nombre='Producto', categoria='ENTRADA', descripcion='x', precio='2.00'
+        )
+
+    def _toggle(self, _):
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        try:
+            url = reverse('producto-detail', args=[self.producto.id])
+            return client.patch(url, {'estado': 'toggle'}, format='json').status_code
+        finally:
+            connection.close()
+
+    def test_toggles_en_paralelo_no_pierden_actualizaciones(self):
+        # Con lectura + save() en Python dos toggles simultáneos podían anularse
+        for total in (7, 10):
+            estado_inicial = Producto.objects.get(pk=self.producto.pk).estado
+            with ThreadPoolExecutor(max_workers=5) as pool:
+                codigos = list(pool.map(self._toggle, range(total)))
+
+            self.assertEqual(codigos, [status.HTTP_200_OK] * total)
+            esperado = estado_inicial if total % 2 == 0 else (
+                'FUERA_STOCK' if estado_inicial == 'DISPONIBLE' else 'DISPONIBLE'
+            )
+            self.assertEqual(Producto.objects.get(pk=self.producto.pk).estado, esperado)
+
+
+class BenchmarkApiTests(APITransactionTestCase):
+    # Con DB_REPLICAS los hilos del benchmark también leen de las réplicas
+    databases = '__all__'
+
+    def test_informe_y_limpieza(self):
+        salida = StringIO()
+        call_command(
+            'benchmark_api', productos=30, promociones=5, peticiones=2, concurrencia='1,2',
+            stdout=salida, stderr=StringIO(),
+        )
+        informe = json.loads(salida.getvalue())
+
+        self.assertEqual(set(informe['resultados']), {'1', '2'})
+        for escenario in informe['resultados']['2'].values():
+            self.assertEqual(escenario['errores'], 0)
+            self.assertIn('p99_ms', escenario)
+            self.assertGreater(escenario['consultas_por_peticion'], 0)
+        self.assertFalse(Producto.objects.exists())
+        self.assertFalse(Promocion.objects.exists())
+        self.assertFalse(Empleado.objects.exists())
+        self.assertFalse(EventoMenu.objects.exists())
+
+
+class AutenticacionSinEstadoTests(APITestCase):
+    def setUp(self):
+        self.admin = Empleado.objects.create_user(
+            username='admin',
+            password='admin123',
+            tipo_empleado='ADM',
+            email='admin@test.com'
+        )
+        self.mesero = Empleado.objects.create_user(
+            username='mesero',
+            password='mesero123',
+            tipo_empleado='MES',
+            email='mesero@test.com'
+        )
+        self.producto = Producto.objects.create(
+            nombre='Producto 1', categoria='ENTRADA', descripcion='x', precio='2.00'
+        )
+
+    def _cliente(self, usuario):
+        client = APIClient()
+        response = client.post(reverse('token_obtain_pair'), {'username': usuario.username, 'password': f'{usuario.username}123'})
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def test_peticiones_autenticadas_sin_consultar_empleado(self):
+        client = self._cliente(self.admin)
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.patch(
+                reverse('producto-detail', args=[self.producto.id]), {'estado': 'toggle'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in consultas if 'AppVehiculos_empleado' in q['sql']])
+
+    def test_permisos_con_usuario_del_token(self):
+        data = {
+            'nombre': 'Promo', 'descripcion': 'x', 'descuento': '5.00', 'productos': [self.producto.id],
+            'fecha_inicio': timezone.now().date().isoformat(), 'fecha_fin': timezone.now().date().isoformat(),
+        }
+        response = self._cliente(self.mesero).post(reverse('promocion-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self._cliente(self.admin).post(reverse('promocion-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self._cliente(self.mesero).post(reverse('empleado-list'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_empleado_completo_en_cache(self):
+        from .authentication import EmpleadoToken
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        token = AccessToken.for_user(self.mesero)
+        with self.assertNumQueries(1):
+            self.assertEqual(EmpleadoToken(token).empleado, self.mesero)
+            self.assertEqual(EmpleadoToken(token).empleado, self.mesero)
+
+        self.mesero.telefono = '555'
+        self.mesero.save()
+        self.assertEqual(EmpleadoToken(token).empleado.telefono, '555')
+
+
+class RefreshTokenBlacklistTests(APITestCase):
+    def setUp(self):
+        self.mesero = Empleado.objects.create_user(
+            username='mesero',
+            password='mesero123',
+            tipo_empleado='MES',
+            email='mesero@test.com'
+        )
+        revocados.limpiar()
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'mesero', 'password': 'mesero123'})
+        self.refresh = response.data['refresh']
+
+    def test_rotacion_revoca_el_refresh_anterior(self):
+        url = reverse('token_refresh')
+        response = self.client.post(url, {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('refresh', response.data)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+        response = self.client.post(url, {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocado_reciente_se_rechaza_sin_consultar(self):
+        url = reverse('token_refresh')
+        self.client.post(url, {'refresh': self.refresh})
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocado_en_bd_se_detecta_sin_cache_local(self):
+        url = reverse('token_refresh')
+        self.client.post(url, {'refresh': self.refresh})
+        revocados.limpiar()
+
+        response = self.client.post(url, {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_podar_tokens_expirados(self):
+        self.client.post(reverse('token_refresh'), {'refresh': self.refresh})
+        OutstandingToken.objects.filter(blacklistedtoken__isnull=False).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        call_command('podar_tokens', lote=1, stdout=StringIO())
+
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+
+    def test_lru_de_revocados_se_poda_al_agregar(self):
+        from .tokens import JTIsRevocados
+        lru = JTIsRevocados(intervalo_poda=0)
+        lru.agregar('vencido', time.time() - 1)
+        lru.agregar('vigente', time.time() + 60)
+        self.assertEqual(list(lru._jtis), ['vigente'])
+
+
+class LecturaAsincronaTests(TestCase):
+    def setUp(self):
+        self.producto1 = Producto.objects.create(
+            nombre='Producto 1', categoria='PLATO_PRINCIPAL', descripcion='Descripción 1', precio='10.99'
+        )
+        self.producto2 = Producto.objects.create(
+            nombre='Producto 2', categoria='BEBIDA', descripcion='Descripción 2', precio='5.99'
+        )
+        self.promocion = Promocion.objects.create(
+            nombre='Promoción Test',
+            descripcion='Descripción promoción',
+            descuento=10.00,
+            fecha_inicio=timezone.now().date(),
+            fecha_fin=timezone.now().date() + timedelta(days=7),
+        )
+        self.promocion.productos.add(self.producto1, self.producto2)
+
+    async def test_mismo_contenido_que_las_vistas_sincronas(self):
+        pares = [
+            ('/api/async/productos/', '/api/productos/'),
+            (f'/api/async/productos/{self.producto1.id}/', f'/api/productos/{self.producto1.id}/'),
+            ('/api/async/promociones/', '/api/promociones/'),
+            (f'/api/async/promociones/{self.promocion.id}/', f'/api/promociones/{self.promocion.id}/'),
+            ('/api/async/productos/?categoria=BEBIDA', '/api/productos/?categoria=BEBIDA'),
+        ]
+        for asincrona, sincrona in pares:
+            respuesta_async = await self.async_client.get(asincrona)
+            respuesta_sync = await sync_to_async(self.client.get)(sincrona)
+            self.assertEqual(respuesta_async.status_code, 200)
+            self.assertEqual(respuesta_async.content, respuesta_sync.content)
+
+    async def test_paginacion_por_cursor_como_la_api_sincrona(self):
+        segunda = await sync_to_async(Promocion.objects.create)(
+            nombre='Otra', descripcion='x', descuento=5, fecha_inicio=timezone.now().date(),
+            fecha_fin=timezone.now().date(),
+        )
+        await Promocion.objects.filter(pk=segunda.pk).aupdate(
+            imagen='promociones/originales/a.png', imagen_hash='a' * 64, imagen_lista=True
+        )
+        for asincrona, sincrona in [('/api/async/productos/', '/api/productos/'),
+                                    ('/api/async/promociones/', '/api/promociones/')]:
+            respuesta_async = (await self.async_client.get(asincrona, {'page_size': 1})).json()
+            respuesta_sync = (await sync_to_async(self.client.get)(sincrona, {'page_size': 1})).json()
+            self.assertEqual(respuesta_async['results'], respuesta_sync['results'])
+            self.assertIn('cursor=', respuesta_async['next'])
+            siguiente_async = (await self.async_client.get(respuesta_async['next'])).json()
+            siguiente_sync = (await sync_to_async(self.client.get)(respuesta_sync['next'])).json()
+            self.assertEqual(siguiente_async['results'], siguiente_sync['results'])
+            self.assertIsNone(siguiente_async['next'])
+        self.assertTrue(siguiente_async['results'][0]['imagenes']['card'].startswith('http://testserver/'))
+
+    async def test_no_encontrado_y_metodo_no_permitido(self):
+        response = await self.async_client.get('/api/async/productos/999999/')
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.post('/api/async/productos/')
+        self.assertEqual(response.status_code, 405)
+
+
+class PedidoTests(APITestCase):
+    def setUp(self):
+        self.mesero = Empleado.objects.create_user(
+            username='mesero',
+            password='mesero123',
+            tipo_empleado='MES',
+            email='mesero@test.com'
+        )
+        self.productos = [
+            Producto.objects.create(nombre=f'Plato {i}', categoria='PLATO_PRINCIPAL', descripcion='x', precio='10.00')
+            for i in range(5)
+        ]
+        self.agotado = Producto.objects.create(
+            nombre='Agotado', categoria='POSTRE', descripcion='x', precio='4.00', estado='FUERA_STOCK'
+        )
+        promocion = Promocion.objects.create(
+            nombre='Promo', descripcion='x', descuento='20.00',
+            fecha_inicio=timezone.now().date(), fecha_fin=timezone.now().date(),
+        )
+        promocion.productos.add(self.productos[0])
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.mesero)
+        self.url = reverse('pedido-list')
+
+    def test_crear_pedido_en_consultas_constantes(self):
+        data = {
+            'mesa': '7',
+            'lineas': [{'producto': producto.id, 'cantidad': 2} for producto in self.productos],
+        }
+        # producto + precio vigente, INSERT del pedido, INSERT masivo de líneas y savepoints
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len([q for q in consultas if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]), 3)
+        self.assertEqual(response.data['total'], '96.00')
+        self.assertEqual(response.data['mesero'], self.mesero.id)
+        self.assertEqual(response.data['lineas'][0]['precio_unitario'], '8.00')
+        self.assertEqual(LineaPedido.objects.filter(pedido_id=response.data['id']).count(), 5)
+
+    def test_eliminar_producto_con_pedidos(self):
+        self.client.post(self.url, {'lineas': [{'producto': self.productos[1].id, 'cantidad': 1}]}, format='json')
+        admin = APIClient()
+        admin.force_authenticate(user=Empleado.objects.create_user(username='admin', password='x', tipo_empleado='ADM'))
+
+        response = admin.delete(reverse('producto-detail', args=[self.productos[1].id]))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertTrue(Producto.objects.filter(pk=self.productos[1].id).exists())
+        response = admin.delete(reverse('producto-detail', args=[self.productos[2].id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_errores_por_linea(self):
+        data = {'lineas': [
+            {'producto': self.productos[1].id, 'cantidad': 1, 'precio_unitario': '9.00'},
+            {'producto': self.agotado.id, 'cantidad': 1},
+            {'producto': 999999, 'cantidad': 1},
+            {'producto': self.productos[2].id, 'cantidad': 1, 'precio_unitario': '10.00'},
+        ]}
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errores = response.data['lineas']
+        self.assertIn('precio_unitario', errores[0])
+        self.assertIn('producto', errores[1])
+        self.assertIn('producto', errores[2])
+        self.assertEqual(errores[3], {})
+        self.assertEqual(Pedido.objects.count(), 0)
+
+    def test_pedido_vacio(self):
+        response = self.client.post(self.url, {'lineas': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cola_de_cocina_por_estado_y_llegada(self):
+        ids = []
+        for producto in self.productos[:3]:
+            response = self.client.post(self.url, {'lineas': [{'producto': producto.id, 'cantidad': 1}]}, format='json')
+            ids.append(response.data['id'])
+        response = self.client.patch(reverse('pedido-detail', args=[ids[0]]), {'estado': 'LISTO'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual([p['id'] for p in response.data], ids[1:])
+        self.assertEqual(response.data[0]['lineas'][0]['producto_nombre'], 'Plato 1')
+
+        response = self.client.get(self.url, {'estado': 'LISTO'})
+        self.assertEqual([p['id'] for p in response.data], ids[:1])
+
+    def test_pedidos_requieren_autenticacion(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+# TransactionTestCase: los eventos se insertan al confirmar cada cambio
+@override_settings(SSE_INTERVALO=0.01, SSE_DURACION_MAXIMA=0.2)
+class EventosMenuTests(TransactionTestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(
+            nombre='Producto 1', categoria='ENTRADA', descripcion='x', precio='2.00'
+        )
+
+    async def _eventos(self, **headers):
+        response = await self.async_client.get(reverse('eventos-menu'), headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        contenido = b''.join([parte.encode() if isinstance(parte, str) else parte
+                              async for parte in response.streaming_content]).decode()
+        eventos = []
+        for bloque in contenido.split('\n\n'):
+            campos = dict(linea.split(': ', 1) for linea in bloque.splitlines() if not linea.startswith(':'))
+            if 'id' in campos:
+                eventos.append((int(campos['id']), campos['event'], json.loads(campos['data'])))
+        return eventos
+
+    async def test_reanudar_desde_last_event_id(self):
+        primero = await EventoMenu.objects.alatest('id')
+        await sync_to_async(Producto.objects.filter(pk=self.producto.pk).alternar_estado)()
+        await sync_to_async(notificar_cambio_menu)(Producto, [self.producto.pk])
+        await Promocion.objects.acreate(
+            nombre='Promo', descripcion='x', descuento='5.00',
+            fecha_inicio=timezone.now().date(), fecha_fin=timezone.now().date(),
+        )
+
+        eventos = await self._eventos(**{'Last-Event-ID': str(primero.id)})
+
+        self.assertEqual([(e[1], e[2]['accion']) for e in eventos], [('producto', 'actualizado'), ('promocion', 'creado')])
+        self.assertEqual(eventos[0][2]['ids'], [self.producto.pk])
+
+    async def test_conexion_nueva_no_repite_historial(self):
+        self.assertEqual(await self._eventos(), [])
+
+    def test_cambio_masivo_es_un_solo_evento(self):
+        Producto.objects.create(nombre='Producto 2', categoria='ENTRADA', descripcion='x', precio='2.00')
+        antes = EventoMenu.objects.count()
+        client = APIClient()
+        client.force_authenticate(user=Empleado.objects.create_user(username='admin', password='x', tipo_empleado='ADM'))
+        client.patch(reverse('producto-list'), {'categoria': 'ENTRADA', 'estado': 'toggle'}, format='json')
+
+        self.assertEqual(EventoMenu.objects.count(), antes + 1)
+        self.assertEqual(len(EventoMenu.objects.latest('id').ids), 2)
+
+    def test_evento_se_registra_al_confirmar(self):
+        # El id se asigna al confirmar: una transacción larga no deja un id menor detrás de Last-Event-ID
+        antes = EventoMenu.objects.count()
+        with transaction.atomic():
+            notificar_cambio_menu(Producto, [self.producto.pk])
+            self.assertEqual(EventoMenu.objects.count(), antes)
+        self.assertEqual(EventoMenu.objects.count(), antes + 1)
+
+    def test_evento_existe_al_invalidar_la_cache(self):
+        # El SSE consulta eventos al ver la versión nueva: el evento debe estar ya insertado
+        antes = EventoMenu.objects.count()
+        vistos = []
+        with mock.patch('AppVehiculos.signals.invalidar_menu', lambda: vistos.append(EventoMenu.objects.count())):
+            with transaction.atomic():
+                notificar_cambio_menu(Producto, [self.producto.pk])
+        self.assertEqual(vistos, [antes, antes + 1])
+
+
+class BusquedaProductoTests(APITestCase):
+    def setUp(self):
+        self.limonada = Producto.objects.create(
+            nombre='Limonada de coco', categoria='BEBIDA', descripcion='Bebida fría', precio='4.00'
+        )
+        self.pescado = Producto.objects.create(
+            nombre='Pescado al ajillo', categoria='PLATO_PRINCIPAL', descripcion='Con salsa de limón', precio='20.00'
+        )
+        self.cafe = Producto.objects.create(
+            nombre='Café', categoria='BEBIDA', descripcion='Tinto', precio='2.00'
+        )
+        self.url = reverse('producto-search')
+
+    def _buscar(self, q):
+        response = self.client.get(self.url, {'q': q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [p['nombre'] for p in response.data]
+
+    def test_prefijo_sin_tildes_y_ranking(self):
+        # El nombre pesa más que la descripción
+        self.assertEqual(self._buscar('limon'), ['Limonada de coco', 'Pescado al ajillo'])
+        self.assertEqual(self._buscar('CAFE'), ['Café'])
+        self.assertEqual(self._buscar('pesc aji'), ['Pescado al ajillo'])
+
+    def test_indice_sincronizado_por_senales(self):
+        self.cafe.nombre = 'Capuchino'
+        self.cafe.save()
+        self.assertEqual(self._buscar('capu'), ['Capuchino'])
+        self.assertEqual(self._buscar('cafe'), [])
+
+        self.limonada.delete()
+        self.assertEqual(self._buscar('limon'), ['Pescado al ajillo'])
+
+    def test_texto_vacio_o_con_simbolos(self):
+        self.assertEqual(self._buscar(''), [])
+        self.assertEqual(self._buscar('"*'), [])
+
+    def test_limite_acotado_y_validado(self):
+        response = self.client.get(self.url, {'q': 'limon', 'limite': -1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(self.url, {'q': 'limon', 'limite': 'muchos'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+MEDIA_PRUEBAS = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS, IMAGENES_SINCRONO=True)
+class ImagenPromocionTests(APITestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        self.admin = Empleado.objects.create_user(username='admin', password='admin123', tipo_empleado='ADM')
+        self.producto = Producto.objects.create(
+            nombre='Hamburguesa', categoria='PLATO_PRINCIPAL', descripcion='Doble', precio='12.00'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def _imagen(self, color='red', nombre='foto.png'):
+        salida = BytesIO()
+        Image.new('RGB', (1200, 800), color).save(salida, 'PNG')
+        return SimpleUploadedFile(nombre, salida.getvalue(), content_type='image/png')
+
+    def _crear(self, imagen):
+        datos = {
+            'nombre': 'Combo', 'descripcion': 'Con imagen', 'descuento': '10.00',
+            'productos': [self.producto.id], 'fecha_inicio': timezone.now().date(),
+            'fecha_fin': timezone.now().date() + timedelta(days=3), 'estado': 'ACTIVA', 'imagen': imagen,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('promocion-list'), datos, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return Promocion.objects.get(pk=response.data['id'])
+
+    def test_versiones_generadas_tras_commit(self):
+        promocion = self._crear(self._imagen())
+        self.assertEqual(len(promocion.imagen_hash), 64)
+        self.assertTrue(promocion.imagen_lista)
+        self.assertTrue(promocion.imagen.name.startswith(f'promociones/originales/{promocion.imagen_hash}'))
+        for rendicion, (ancho, alto, _) in RENDICIONES.items():
+            with default_storage.open(ruta_rendicion(promocion.imagen_hash, rendicion), 'rb') as archivo:
+                imagen = Image.open(archivo)
+                self.assertEqual(imagen.format, 'WEBP')
+                self.assertLessEqual(imagen.width, ancho)
+                self.assertLessEqual(imagen.height, alto)
+
+        response = self.client.get(reverse('promocion-detail', args=[promocion.id]))
+        self.assertTrue(response.data['imagenes']['thumbnail'].endswith('/thumbnail.webp'))
+
+    def test_imagen_repetida_no_se_reprocesa(self):
+        primera = self._crear(self._imagen(nombre='a.png'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            segunda = Promocion.objects.create(
+                nombre='Otra', descripcion='Misma foto', descuento='5.00', fecha_inicio=timezone.now().date(),
+                fecha_fin=timezone.now().date(), imagen=self._imagen(nombre='b.png'),
+            )
+        self.assertEqual(segunda.imagen_hash, primera.imagen_hash)
+        self.assertEqual(segunda.imagen.name, primera.imagen.name)
+        self.assertTrue(segunda.imagen_lista)
+        # Solo queda la invalidación de caché; no se encola procesamiento
+        self.assertFalse([c for c in callbacks if c.__qualname__.startswith('_procesar_imagen_promocion')])
+
+    def test_pendiente_apunta_al_original(self):
+        promocion = Promocion.objects.create(
+            nombre='Pendiente', descripcion='Sin procesar', descuento='5.00', fecha_inicio=timezone.now().date(),
+            fecha_fin=timezone.now().date(), imagen=self._imagen('blue'),
+        )
+        self.assertFalse(promocion.imagen_lista)
+        response = self.client.get(reverse('promocion-detail', args=[promocion.id]))
+        self.assertEqual(set(response.data['imagenes'].values()), {response.data['imagen']})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class MetricasTests(APITestCase):
+    def setUp(self):
+        metricas.reiniciar()
+        self.admin = Empleado.objects.create_user(username='admin', password='admin123', tipo_empleado='ADM')
+        self.mesero = Empleado.objects.create_user(username='mesero', password='mesero123', tipo_empleado='MES')
+        Producto.objects.create(nombre='Sopa', categoria='ENTRADA', descripcion='Del día', precio='6.00')
+
+    def test_server_timing_e_histogramas(self):
+        response = self.client.get(reverse('producto-list'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 consultas", app;dur=[\d.]+;desc="producto-list"$')
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('metricas'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        texto = response.content.decode()
+        self.assertIn('restaurante_peticiones_total{vista="producto-list",metodo="GET",codigo="200"} 1', texto)
+        self.assertIn('restaurante_sql_consultas_bucket{vista="producto-list",metodo="GET",le="0"} 0', texto)
+        self.assertIn('restaurante_sql_consultas_bucket{vista="producto-list",metodo="GET",le="1"} 1', texto)
+        self.assertIn('restaurante_peticion_segundos_count{vista="producto-list",metodo="GET"} 1', texto)
+
+    def test_metricas_solo_admin(self):
+        self.client.force_authenticate(user=self.mesero)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_consultas_de_vistas_asincronas(self):
+        response = await self.async_client.get('/api/async/productos/')
+        self.assertIn('desc="1 consultas"', response['Server-Timing'])
+
+
+class LecturaRapidaTests(APITestCase):
+    def setUp(self):
+        self.productos = [
+            Producto.objects.create(nombre='Té', categoria='BEBIDA', descripcion='Frío', precio='3.5'),
+            Producto.objects.create(nombre='Flan', categoria='POSTRE', descripcion='Casero', precio='4.00',
+                                    estado='FUERA_STOCK'),
+            Producto.objects.create(nombre='Arroz', categoria='ADICION', descripcion='Blanco', precio='1000.10'),
+        ]
+        hoy = timezone.now().date()
+        con_imagen = Promocion.objects.create(
+            nombre='Con imagen', descripcion='Lista', descuento='12.5', fecha_inicio=hoy, fecha_fin=hoy,
+        )
+        con_imagen.productos.add(*self.productos)
+        pendiente = Promocion.objects.create(
+            nombre='Pendiente', descripcion='Procesando', descuento='5', fecha_inicio=hoy,
+            fecha_fin=hoy + timedelta(days=2), estado='INACTIVA',
+        )
+        pendiente.productos.add(self.productos[1])
+        Promocion.objects.create(nombre='Sin productos', descripcion='', descuento='1', fecha_inicio=hoy, fecha_fin=hoy)
+        # Sin pasar por la subida: solo importa cómo se representan las columnas
+        Promocion.objects.filter(pk=con_imagen.pk).update(
+            imagen='promociones/originales/a.png', imagen_hash='a' * 64, imagen_lista=True
+        )
+        Promocion.objects.filter(pk=pendiente.pk).update(imagen='promociones/originales/b.png', imagen_hash='b' * 64)
+
+    def test_misma_salida_que_los_serializers(self):
+        render = JSONRenderer().render
+        productos = Producto.objects.order_by('id')
+        self.assertEqual(
+            render(productos_a_datos(productos.values(*CAMPOS_PRODUCTO))),
+            render(ProductoSerializer(productos, many=True).data),
+        )
+        request = APIRequestFactory().get('/api/promociones/')
+        self.assertEqual(
+            render(promociones_a_datos(Promocion.objects.order_by('id').values(*CAMPOS_PROMOCION), request)),
+            render(PromocionSerializer(promociones_con_productos(), many=True, context={'request': request}).data),
+        )
+
+    def test_listados_paginados_con_la_ruta_rapida(self):
+        primera = self.client.get(reverse('producto-list'), {'page_size': 2})
+        self.assertEqual([p['nombre'] for p in primera.data['results']], ['Té', 'Flan'])
+        self.assertEqual(primera.data['results'][0]['precio'], '3.50')
+        segunda = self.client.get(primera.data['next'])
+        self.assertEqual([p['nombre'] for p in segunda.data['results']], ['Arroz'])
+
+        response = self.client.get(reverse('promocion-list'), {'page_size': 1})
+        self.assertEqual(response.data['results'][0]['productos'], [p.id for p in self.productos])
+        self.assertTrue(response.data['results'][0]['imagenes']['card'].endswith('/card.webp'))
+
+
+@override_settings(STREAM_CHUNK_SIZE=2)
+class ListadoStreamingTests(APITestCase):
+    def setUp(self):
+        for i in range(5):
+            Producto.objects.create(nombre=f'Producto {i}', categoria='ENTRADA', descripcion='x', precio=f'{i}.25')
+        hoy = timezone.now().date()
+        for i in range(3):
+            promocion = Promocion.objects.create(
+                nombre=f'Promo {i}', descripcion='x', descuento='10', fecha_inicio=hoy, fecha_fin=hoy
+            )
+            promocion.productos.add(*Producto.objects.all()[:i])
+
+    def _contenido(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_misma_salida_que_el_listado_completo(self):
+        for url in (reverse('producto-list'), reverse('promocion-list')):
+            completo = self.client.get(url, HTTP_ACCEPT='application/json').content
+            response = self.client.get(url, {'stream': '1'})
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(self._contenido(response), completo)
+
+        vacio = self.client.get(reverse('producto-list'), {'stream': '1', 'categoria': 'POSTRE'})
+        self.assertEqual(self._contenido(vacio), b'[]')
+
+    def test_gzip_si_el_cliente_lo_acepta(self):
+        completo = self.client.get(reverse('producto-list'), HTTP_ACCEPT='application/json').content
+        response = self.client.get(reverse('producto-list'), {'stream': '1'}, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(self._contenido(response)), completo)
+
+    def test_paginacion_tiene_prioridad(self):
+        response = self.client.get(reverse('producto-list'), {'stream': '1', 'page_size': 2})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class RenderersTests(APITestCase):
+    def setUp(self):
+        self.admin = Empleado.objects.create_user(username='admin', password='admin123', tipo_empleado='ADM')
+        self.producto = Producto.objects.create(
+            nombre='Crème brûlée', categoria='POSTRE', descripcion='Línea\u2028nueva', precio='7.10'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def test_orjson_igual_que_drf(self):
+        pedido = self.client.post(
+            reverse('pedido-list'), {'mesa': '3', 'lineas': [{'producto': self.producto.id, 'cantidad': 2}]},
+            format='json',
+        ).data
+        datos = [pedido, {'total': Decimal('10.50'), 'fecha': timezone.now(), 1: 'clave numérica'}]
+        # Única diferencia buscada: un Decimal sin convertir sale como cadena y no como float
+        drf = JSONRenderer().render(datos).replace(b'10.5,', b'"10.50",')
+        self.assertEqual(ORJSONRenderer().render(datos), drf)
+
+        response = self.client.get(reverse('producto-list'))
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    @skipUnless(msgpack, 'msgpack no está instalado')
+    def test_messagepack_por_accept(self):
+        json_respuesta = self.client.get(reverse('producto-list'), HTTP_ACCEPT='application/json')
+        response = self.client.get(reverse('producto-list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(json_respuesta.content))
+
+        asincrona = self.client.get(reverse('async-producto-list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(asincrona['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(asincrona.content), json.loads(json_respuesta.content))
+
+    @skipUnless(msgpack, 'msgpack no está instalado')
+    def test_messagepack_en_el_cuerpo(self):
+        datos = {'nombre': 'Agua', 'categoria': 'BEBIDA', 'descripcion': 'Sin gas', 'precio': '1.50'}
+        response = self.client.post(
+            reverse('producto-list'), msgpack.packb(datos), content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(response.content)['precio'], '1.50')
+
+        response = self.client.post(reverse('producto-list'), b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportarCatalogoTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def _fichero(self, nombre, contenido):
+        ruta = f'{self.directorio}/{nombre}'
+        with open(ruta, 'w', encoding='utf-8') as fichero:
+            fichero.write(contenido)
+        return ruta
+
+    def _importar(self, ruta, modelo, **opciones):
+        salida, errores = StringIO(), StringIO()
+        call_command('importar_catalogo', ruta, modelo=modelo, stdout=salida, stderr=errores, **opciones)
+        return salida.getvalue(), errores.getvalue()
+
+    def test_csv_por_lotes_con_errores_y_upsert(self):
+        ruta = self._fichero('productos.csv', (
+            'nombre,categoria,descripcion,precio,estado\n'
+            'Sopa,ENTRADA,Del día,6.00,DISPONIBLE\n'
+            'Malo,NO_EXISTE,x,1.00,DISPONIBLE\n'
+            'Jugo,BEBIDA,Natural,3.50,DISPONIBLE\n'
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            salida, errores = self._importar(ruta, 'productos', lote=2)
+        self.assertIn('3 leidas, 2 creadas', salida)
+        self.assertIn('Fila 2:', errores)
+        self.assertTrue(EventoMenu.objects.filter(modelo='producto', accion='creado').exists())
+        self.assertEqual(PrecioVigente.objects.count(), 2)
+
+        ruta = self._fichero('productos.ndjson', (
+            '{"nombre": "Sopa", "categoria": "ENTRADA", "descripcion": "Del día", "precio": "7.00"}\n'
+            '{"nombre": "Jugo", "categoria": "BEBIDA", "descripcion": "Natural", "precio": "3.50"}\n'
+            '{"nombre": "Té", "categoria": "BEBIDA", "descripcion": "Frío", "precio": "2.00"}\n'
+        ))
+        salida, _ = self._importar(ruta, 'productos', upsert=True, dry_run=True)
+        self.assertIn('[dry-run] productos: 3 leidas, 1 creadas, 1 actualizadas, 1 sin_cambios', salida)
+        self.assertEqual(Producto.objects.count(), 2)
+
+        salida, _ = self._importar(ruta, 'productos', upsert=True)
+        self.assertIn('1 creadas, 1 actualizadas, 1 sin_cambios', salida)
+        self.assertEqual(Producto.objects.count(), 3)
+        self.assertEqual(Producto.objects.get(nombre='Sopa').precio, Decimal('7.00'))
+        self.assertEqual(PrecioVigente.objects.get(producto__nombre='Sopa').precio_final, Decimal('7.00'))
+
+    def test_promociones_json_con_referencias_por_id_y_nombre(self):
+        sopa = Producto.objects.create(nombre='Sopa', categoria='ENTRADA', descripcion='x', precio='6.00')
+        jugo = Producto.objects.create(nombre='Jugo', categoria='BEBIDA', descripcion='x', precio='3.00')
+        hoy = timezone.now().date().isoformat()
+        promociones = [
+            {'nombre': 'Combo', 'descripcion': 'x', 'descuento': '10', 'fecha_inicio': hoy, 'fecha_fin': hoy,
+             'productos': [sopa.id, 'Jugo']},
+            {'nombre': 'Fantasma', 'descripcion': 'x', 'descuento': '10', 'fecha_inicio': hoy, 'fecha_fin': hoy,
+             'productos': ['No existe']},
+        ]
+        ruta = self._fichero('promociones.json', json.dumps(promociones, indent=2))
+        salida, errores = self._importar(ruta, 'promociones')
+        self.assertIn('2 leidas, 1 creadas', salida)
+        self.assertIn('Productos no encontrados: No existe', errores)
+        combo = Promocion.objects.get(nombre='Combo')
+        self.assertEqual(sorted(combo.productos.values_list('id', flat=True)), [sopa.id, jugo.id])
+        self.assertEqual(PrecioVigente.objects.get(producto=sopa).descuento, Decimal('10.00'))
+
+        promociones[0]['productos'] = ['Sopa']
+        ruta = self._fichero('promociones.json', json.dumps(promociones[:1]))
+        self._importar(ruta, 'promociones', upsert=True)
+        self.assertEqual(list(combo.productos.values_list('id', flat=True)), [sopa.id])
+        self.assertEqual(PrecioVigente.objects.get(producto=jugo).descuento, Decimal('0.00'))
+
+    def test_upsert_sin_productos_conserva_enlaces(self):
+        sopa = Producto.objects.create(nombre='Sopa', categoria='ENTRADA', descripcion='x', precio='6.00')
+        hoy = timezone.now().date().isoformat()
+        combo = Promocion.objects.create(nombre='Combo', descripcion='x', descuento=10, fecha_inicio=hoy, fecha_fin=hoy)
+        combo.productos.add(sopa)
+
+        ruta = self._fichero('promociones.csv', (
+            'nombre,descripcion,descuento,fecha_inicio,fecha_fin\n'
+            f'Combo,Nueva,15,{hoy},{hoy}\n'
+        ))
+        salida, _ = self._importar(ruta, 'promociones', upsert=True)
+        self.assertIn('1 actualizadas', salida)
+        combo.refresh_from_db()
+        self.assertEqual(combo.descuento, Decimal('15.00'))
+        self.assertEqual(list(combo.productos.values_list('id', flat=True)), [sopa.id])
+
+        salida, _ = self._importar(ruta, 'promociones', upsert=True)
+        self.assertIn('1 sin_cambios', salida)
+
+    def test_clave_desconocida(self):
+        ruta = self._fichero('productos.csv', 'nombre,precio\nSopa,6.00\n')
+        with self.assertRaisesMessage(CommandError, 'campos desconocidos en productos: sku'):
+            self._importar(ruta, 'productos', upsert=True, clave='nombre,sku')
+
+
+class SnapshotMenuTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(MENU_SNAPSHOT_DIR=self.directorio, MENU_SNAPSHOT_SINCRONO=True,
+                                    MENU_SNAPSHOT_CONSERVAR=1)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _leer(self, nombre, modo='r'):
+        with open(f'{self.directorio}/{nombre}', modo) as fichero:
+            return fichero.read()
+
+    def test_publica_al_confirmar_cambios(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sopa = Producto.objects.create(nombre='Sopa', categoria='ENTRADA', descripcion='x', precio='6.00')
+        manifiesto = json.loads(self._leer('manifest.json'))
+        menu = json.loads(self._leer(manifiesto['archivo']))
+        self.assertEqual(menu['productos'][0]['categoria_nombre'], 'Entrada')
+        self.assertEqual(self._leer('menu.json'), self._leer(manifiesto['archivo']))
+        self.assertEqual(gzip.decompress(self._leer('menu.json.gz', 'rb')), self._leer('menu.json', 'rb'))
+
+        hoy = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            promocion = Promocion.objects.create(
+                nombre='Combo', descripcion='x', descuento='10', fecha_inicio=hoy, fecha_fin=hoy
+            )
+            promocion.productos.add(sopa)
+        nuevo = json.loads(self._leer('manifest.json'))
+        self.assertNotEqual(nuevo['version'], manifiesto['version'])
+        self.assertEqual(nuevo['anteriores'], [manifiesto['archivo']])
+        self.assertEqual(json.loads(self._leer('menu.json'))['promociones'][0]['productos'], [sopa.id])
+
+        # Sin cambios de contenido no se reescribe; las versiones fuera de MENU_SNAPSHOT_CONSERVAR se borran
+        salida = StringIO()
+        call_command('publicar_menu', stdout=salida)
+        self.assertIn(nuevo['version'], salida.getvalue())
+        self.assertEqual(json.loads(self._leer('manifest.json'))['generado'], nuevo['generado'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.filter(pk=sopa.pk).update(precio='7.00')
+            notificar_cambio_menu(Producto, [sopa.pk])
+        archivos = set(os.listdir(self.directorio))
+        self.assertNotIn(manifiesto['archivo'], archivos)
+        self.assertIn(nuevo['archivo'], archivos)
+        self.assertFalse([nombre for nombre in archivos if nombre.startswith('.')])
+
+
+class PromocionesActivasTests(APITestCase):
+    def setUp(self):
+        self.hoy = timezone.now().date()
+        self.producto = Producto.objects.create(nombre='Sopa', categoria='ENTRADA', descripcion='x', precio='10.00')
+
+        def crear(nombre, inicio, fin, estado='ACTIVA'):
+            promocion = Promocion.objects.create(
+                nombre=nombre, descripcion='x', descuento='10', estado=estado,
+                fecha_inicio=self.hoy + timedelta(days=inicio), fecha_fin=self.hoy + timedelta(days=fin),
+            )
+            promocion.productos.add(self.producto)
+            return promocion
+
+        self.vigente = crear('Vigente', -1, 1)
+        self.futura = crear('Futura', 2, 5)
+        self.vencida = crear('Vencida', -10, -1)
+        self.inactiva = crear('Inactiva', -1, 1, estado='INACTIVA')
+
+    def _nombres(self, **params):
+        response = self.client.get(reverse('promocion-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [promocion['nombre'] for promocion in response.data]
+
+    def test_filtro_activa(self):
+        self.assertEqual(self._nombres(activa='1'), ['Vigente'])
+        self.assertEqual(self._nombres(activa='true', fecha=str(self.hoy + timedelta(days=3))), ['Futura'])
+        self.assertEqual(self._nombres(activa='0'), ['Futura', 'Vencida', 'Inactiva'])
+        self.assertEqual(len(self._nombres()), 4)
+        self.assertEqual(self.client.get(reverse('promocion-list'), {'activa': 'quizas'}).status_code, 400)
+
+    def test_cache_de_activas_cambia_con_el_dia(self):
+        self.assertEqual(self._nombres(activa='1'), ['Vigente'])
+        pasado_manana = timezone.now() + timedelta(days=2)
+        with mock.patch('django.utils.timezone.now', return_value=pasado_manana):
+            self.assertEqual(self._nombres(activa='1'), ['Futura'])
+
+    def test_anotacion_coincide_con_esta_activa(self):
+        for promocion in Promocion.objects.con_activa():
+            self.assertEqual(promocion.activa, promocion.esta_activa())
+
+    def test_admin_lista_en_consultas_constantes(self):
+        admin_user = Empleado.objects.create_superuser(username='root', password='x', email='root@test.com')
+        self.client.force_login(admin_user)
+        url = reverse('admin:AppVehiculos_promocion_changelist')
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get(url)
+        for i in range(10):
+            Promocion.objects.create(nombre=f'Extra {i}', descripcion='x', descuento='5',
+                                     fecha_inicio=self.hoy, fecha_fin=self.hoy)
+        with CaptureQueriesContext(connection) as muchas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(muchas), len(pocas))
+
+    def test_expirar_promociones(self):
+        salida = StringIO()
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as consultas:
+            call_command('expirar_promociones', stdout=salida)
+        self.assertIn('1 promociones expiradas', salida.getvalue())
+        # Sin SELECT previo de ids: el UPDATE filtra por estado y fecha y devuelve los afectados
+        sentencias = [q['sql'] for q in consultas if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertTrue(sentencias[0].startswith('UPDATE "AppVehiculos_promocion"'), sentencias[0])
+        self.vencida.refresh_from_db()
+        self.assertEqual(self.vencida.estado, 'INACTIVA')
+        self.assertEqual(Promocion.objects.filter(estado='ACTIVA').count(), 2)
+        self.assertTrue(EventoMenu.objects.filter(modelo='promocion', ids=[self.vencida.id]).exists())
+
+        call_command('expirar_promociones', fecha=str(self.hoy + timedelta(days=6)), stdout=salida)
+        self.assertFalse(Promocion.objects.filter(estado='ACTIVA').exists())
+
+
+class PromocionProductosPorLoteTests(APITestCase):
+    def setUp(self):
+        self.hoy = timezone.now().date()
+        admin = Empleado.objects.create_user(username='admin', password='x', tipo_empleado='ADM')
+        self.client.force_authenticate(user=admin)
+        self.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', categoria='ENTRADA', descripcion='x', precio='10.00')
+            for i in range(300)
+        ])
+        self.ids = [producto.pk for producto in self.productos]
+        self.existente = Promocion.objects.create(
+            nombre='Existente', descripcion='x', descuento='10', fecha_inicio=self.hoy,
+            fecha_fin=self.hoy + timedelta(days=7),
+        )
+        self.existente.productos.add(*self.ids[:3])
+
+    def _datos(self, productos, inicio=0, fin=7, **extra):
+        return {
+            'nombre': 'Nueva', 'descripcion': 'x', 'descuento': '15.00', 'productos': productos,
+            'fecha_inicio': str(self.hoy + timedelta(days=inicio)),
+            'fecha_fin': str(self.hoy + timedelta(days=fin)), **extra,
+        }
+
+    def test_consultas_no_dependen_del_numero_de_productos(self):
+        url = reverse('promocion-list')
+        with CaptureQueriesContext(connection) as pocas:
+            response = self.client.post(url, self._datos(self.ids[-5:]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        with CaptureQueriesContext(connection) as muchas:
+            # 150 filas de PrecioVigente caben en un solo INSERT también en SQLite
+            response = self.client.post(url, self._datos(self.ids[5:155]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(len(muchas), len(pocas))
+        self.assertEqual(Promocion.objects.get(pk=response.data['id']).productos.count(), 150)
+        self.assertEqual(response.data['productos'], self.ids[5:155])
+
+    def test_informa_de_todos_los_ids_inexistentes(self):
+        ultimo = self.ids[-1]
+        response = self.client.post(
+            reverse('promocion-list'), self._datos([self.ids[0], ultimo + 1, ultimo + 7]), format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['productos'], [f'Productos inexistentes: {ultimo + 1}, {ultimo + 7}.'])
+        self.assertEqual(Promocion.objects.count(), 1)
+        response = self.client.post(reverse('promocion-list'), self._datos(['uno']), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_conflictos_con_promociones_activas_solapadas(self):
+        Promocion.objects.create(
+            nombre='Futura', descripcion='x', descuento='5', fecha_inicio=self.hoy + timedelta(days=20),
+            fecha_fin=self.hoy + timedelta(days=30),
+        ).productos.add(self.ids[0])
+        Promocion.objects.create(
+            nombre='Inactiva', descripcion='x', descuento='5', estado='INACTIVA', fecha_inicio=self.hoy,
+            fecha_fin=self.hoy,
+        ).productos.add(self.ids[0])
+
+        response = self.client.post(reverse('promocion-list'), self._datos(self.ids[1:10], 5, 10), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['conflictos'], [
+            {'promocion': self.existente.pk, 'nombre': 'Existente', 'productos': self.ids[1:3]},
+        ])
+        nueva = response.data['id']
+
+        # PATCH sin productos: se comparan los que ya tiene con las nuevas fechas
+        url = reverse('promocion-detail', args=[nueva])
+        response = self.client.patch(url, {'fecha_inicio': str(self.hoy + timedelta(days=8))}, format='json')
+        self.assertEqual(response.data['conflictos'], [])
+        response = self.client.patch(url, {'estado': 'INACTIVA', 'fecha_inicio': str(self.hoy)}, format='json')
+        self.assertEqual(response.data['conflictos'], [])
+        self.assertNotIn('conflictos', self.client.get(url).data)
+
+    def test_actualizar_reemplaza_productos_y_refresca_precios(self):
+        url = reverse('promocion-detail', args=[self.existente.pk])
+        response = self.client.patch(url, {'productos': self.ids[2:6]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(sorted(self.existente.productos.values_list('id', flat=True)), self.ids[2:6])
+        self.assertEqual(response.data['productos'], self.ids[2:6])
+        self.assertEqual(PrecioVigente.objects.get(producto_id=self.ids[5]).promocion_id, self.existente.pk)
+        self.assertIsNone(PrecioVigente.objects.get(producto_id=self.ids[0]).promocion_id)
+
+    def test_mas_ids_de_los_que_caben_en_un_in(self):
+        self.ids += [producto.pk for producto in Producto.objects.bulk_create([
+            Producto(nombre=f'Extra {i}', categoria='ENTRADA', descripcion='x', precio='10.00') for i in range(1200)
+        ])]
+        # Ids no consecutivos: un rango [min, max] arrastraría los que se saltan
+        elegidos = [producto_id for posicion, producto_id in enumerate(self.ids) if posicion % 4]
+        parametros = []
+
+        def registrar(execute, sql, params, many, context):
+            parametros.append(0 if many else len(params or ()))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(registrar):
+            response = self.client.post(reverse('promocion-list'), self._datos(elegidos), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertLessEqual(max(parametros), connection.features.max_query_params)
+        nueva = Promocion.objects.get(pk=response.data['id'])
+        self.assertEqual(sorted(nueva.productos.values_list('id', flat=True)), elegidos)
+        self.assertEqual(response.data['conflictos'], [
+            {'promocion': self.existente.pk, 'nombre': 'Existente', 'productos': self.ids[1:3]},
+        ])
+        self.assertEqual(
+            sorted(PrecioVigente.objects.filter(promocion=nueva).values_list('producto_id', flat=True)), elegidos
+        )
+
+        parametros.clear()
+        with connection.execute_wrapper(registrar):
+            response = self.client.patch(
+                reverse('promocion-detail', args=[nueva.pk]), {'productos': elegidos[:5]}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertLessEqual(max(parametros), connection.features.max_query_params)
+        self.assertEqual(sorted(nueva.productos.values_list('id', flat=True)), elegidos[:5])
+        self.assertEqual(sorted(self.existente.productos.values_list('id', flat=True)), self.ids[:3])
+        self.assertEqual(
+            sorted(PrecioVigente.objects.filter(promocion=nueva).values_list('producto_id', flat=True)), elegidos[:5]
+        )
+        self.assertEqual(PrecioVigente.objects.filter(promocion__isnull=True).count(), len(elegidos) - 5)
+
+    def test_listado_completo_con_mas_promociones_que_parametros(self):
+        promociones = Promocion.objects.bulk_create([
+            Promocion(nombre=f'Promo {i}', descripcion='x', descuento='5', fecha_inicio=self.hoy, fecha_fin=self.hoy)
+            for i in range(1100)
+        ])
+        Promocion.productos.through.objects.create(promocion_id=promociones[-1].pk, producto_id=self.ids[7])
+        parametros = []
+
+        def registrar(execute, sql, params, many, context):
+            parametros.append(0 if many else len(params or ()))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(registrar):
+            response = self.client.get(reverse('promocion-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(max(parametros), connection.features.max_query_params)
+        self.assertEqual(len(response.data), 1101)
+        self.assertEqual(response.data[-1]['productos'], [self.ids[7]])
+
+
+class AdminEscalableTests(TestCase):
+    def setUp(self):
+        self.hoy = timezone.now().date()
+        self.admin = Empleado.objects.create_superuser(username='root', password='x', email='root@test.com')
+        self.client.force_login(self.admin)
+        self.sopa = Producto.objects.create(
+            nombre='Sopa de tomate', categoria='ENTRADA', descripcion='Con albahaca', precio='8.00'
+        )
+        self.limonada = Producto.objects.create(
+            nombre='Limonada', categoria='BEBIDA', descripcion='Natural', precio='4.00'
+        )
+        self.promocion = Promocion.objects.create(
+            nombre='Verano', descripcion='x', descuento='10', fecha_inicio=self.hoy, fecha_fin=self.hoy,
+        )
+        self.promocion.productos.add(self.sopa)
+
+    def test_formulario_de_promocion_no_carga_todos_los_productos(self):
+        url = reverse('admin:AppVehiculos_promocion_change', args=[self.promocion.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get(url)
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Extra {i}', categoria='POSTRE', descripcion='x', precio='1.00') for i in range(50)
+        ])
+        with CaptureQueriesContext(connection) as muchas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(muchas), len(pocas))
+        self.assertNotContains(response, 'Extra 1')
+        self.assertContains(response, 'admin-autocomplete')
+
+    def test_busqueda_y_autocompletado_usan_el_indice(self):
+        response = self.client.get(reverse('admin:AppVehiculos_producto_changelist'), {'q': 'tomat'})
+        self.assertEqual([producto.pk for producto in response.context['cl'].result_list], [self.sopa.pk])
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'AppVehiculos', 'model_name': 'promocion', 'field_name': 'productos', 'term': 'limo',
+        })
+        self.assertEqual([resultado['id'] for resultado in response.json()['results']], [str(self.limonada.pk)])
+
+    def _accion(self, modelo, accion, ids):
+        return self.client.post(reverse(f'admin:AppVehiculos_{modelo}_changelist'), {
+            'action': accion, '_selected_action': ids,
+        })
+
+    def test_alternar_estado_en_un_solo_update(self):
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            self._accion('producto', 'alternar_estado', [self.sopa.pk, self.limonada.pk])
+        actualizaciones = [q for q in consultas if q['sql'].startswith('UPDATE "AppVehiculos_producto"')]
+        self.assertEqual(len(actualizaciones), 1)
+        self.assertEqual(set(Producto.objects.values_list('estado', flat=True)), {'FUERA_STOCK'})
+        evento = EventoMenu.objects.latest('id')
+        self.assertEqual((evento.modelo, evento.ids), ('producto', sorted([self.sopa.pk, self.limonada.pk])))
+
+    def test_activar_y_desactivar_promociones(self):
+        self._accion('promocion', 'desactivar', [self.promocion.pk])
+        self.promocion.refresh_from_db()
+        self.assertEqual(self.promocion.estado, 'INACTIVA')
+        self.assertEqual(PrecioVigente.objects.get(producto=self.sopa).precio_final, Decimal('8.00'))
+        self._accion('promocion', 'activar', [self.promocion.pk])
+        self.promocion.refresh_from_db()
+        self.assertEqual(self.promocion.estado, 'ACTIVA')
+        self.assertEqual(PrecioVigente.objects.get(producto=self.sopa).precio_final, Decimal('7.20'))
+
+    def test_paginador_cuenta_exacto_fuera_de_postgresql(self):
+        from .pagination import PaginadorConteoEstimado
+        self.assertEqual(PaginadorConteoEstimado(Producto.objects.order_by('id'), 1).count, 2)
+        self.assertEqual(PaginadorConteoEstimado(Producto.objects.filter(categoria='BEBIDA').order_by('id'), 1).count, 1)
+
+    def test_buscar_empleados_por_usuario_o_correo(self):
+        Empleado.objects.create_user(username='mesero', password='x', email='ana@test.com', tipo_empleado='MES')
+        url = reverse('admin:AppVehiculos_empleado_changelist')
+        for termino in ('ana@', 'MES'):
+            response = self.client.get(url, {'q': termino})
+            self.assertEqual([e.username for e in response.context['cl'].result_list], ['mesero'])
+
+
+@override_settings(BASES_LECTURA=['replica'], REPLICA_STICKY_SEGUNDOS=5)
+class ReplicasLecturaTests(APITransactionTestCase):
+    # La réplica es otra base SQLite (copia del esquema de la de tests) para
+    # distinguir de dónde se leyó cada fila. '__all__' se resuelve al preparar
+    # la clase, cuando el alias ya existe; el runner no intenta crearla.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        from django.db import connections
+        cls.directorio = tempfile.mkdtemp()
+        principal = connections['default'].settings_dict
+        replica = os.path.join(cls.directorio, 'replica.sqlite3')
+        shutil.copy(principal['NAME'], replica)
+        connections.settings['replica'] = {**principal, 'NAME': replica}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        from django.db import connections
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directorio)
+
+    def setUp(self):
+        self.mesero = Empleado.objects.create_user(username='mesero', password='x', tipo_empleado='MES')
+        self.producto = Producto.objects.create(nombre='Sopa', categoria='ENTRADA', descripcion='x', precio='8.00')
+        # Réplica con retraso: el producto existe pero aún figura como disponible
+        Producto.objects.using('replica').bulk_create([
+            Producto(id=self.producto.pk, nombre='Sopa', categoria='ENTRADA', descripcion='x', precio='8.00'),
+            Producto(nombre='Solo en réplica', categoria='BEBIDA', descripcion='x', precio='1.00'),
+        ])
+
+    def tearDown(self):
+        Producto.objects.using('replica').all().delete()
+
+    def _nombres(self, client):
+        return [producto['nombre'] for producto in client.get(reverse('producto-list')).data]
+
+    def test_get_de_productos_lee_de_la_replica(self):
+        self.assertEqual(self._nombres(self.client), ['Sopa', 'Solo en réplica'])
+        # Fuera de las vistas marcadas todo va a la primaria
+        self.assertEqual(list(Producto.objects.values_list('nombre', flat=True)), ['Sopa'])
+
+    def _estados(self, client):
+        return {producto['nombre']: producto['estado'] for producto in client.get(reverse('producto-list')).data}
+
+    def test_tras_escribir_el_cliente_lee_de_la_primaria(self):
+        self.client.force_authenticate(user=self.mesero)
+        url = reverse('producto-detail', args=[self.producto.pk])
+        response = self.client.patch(url, {'estado': 'toggle'}, format='json')
+        self.assertEqual(response.cookies['usar_primaria']['max-age'], 5)
+        self.assertEqual(Producto.objects.using('replica').get(pk=self.producto.pk).estado, 'DISPONIBLE')
+
+        # Otros clientes leen la réplica con retraso, pero esa lectura no queda en la caché del menú
+        self.assertEqual(APIClient().get(url).data['estado'], 'DISPONIBLE')
+        self.assertEqual(self._estados(APIClient())['Sopa'], 'DISPONIBLE')
+
+        # El mismo empleado sin la cookie (SPA en otro origen con JWT): fijado por usuario
+        spa = APIClient()
+        spa.force_authenticate(user=self.mesero)
+        self.assertEqual(spa.get(url).data['estado'], 'FUERA_STOCK')
+        self.assertEqual(self._estados(spa)['Sopa'], 'FUERA_STOCK')
+        self.assertEqual(self._estados(self.client)['Sopa'], 'FUERA_STOCK')
+
+        # Lo leído de la primaria sí se cachea y ya lo ven todos
+        self.assertEqual(self._estados(APIClient())['Sopa'], 'FUERA_STOCK')
+
+    def test_autenticacion_y_admin_en_la_primaria(self):
+        from .routers import RouterReplicas, lectura_en_replica
+        router = RouterReplicas()
+        token = lectura_en_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Empleado), 'default')
+            self.assertEqual(router.db_for_read(BlacklistedToken), 'default')
+            self.assertEqual(router.db_for_read(Producto), 'replica')
+            self.assertEqual(router.db_for_write(Producto), 'default')
+        finally:
+            lectura_en_replica.reset(token)
+        self.assertIsNone(router.db_for_read(Producto))
+        self.assertFalse(router.allow_migrate('replica', 'AppVehiculos'))
+
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'mesero', 'password': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class JTIsRevocados:
+    """LRU en proceso de JTIs revocados recientemente, cada uno hasta su expiración."""
+
+    def __init__(self, maximo=10000, intervalo_poda=60):
+        self.maximo = maximo
+        self.intervalo_poda = intervalo_poda
+        self._jtis = OrderedDict()
+        self._lock = threading.Lock()
+        self._ultima_poda = time.monotonic()
+
+    def agregar(self, jti, exp):
+        with self._lock:
+            # La poda vive en cada proceso que atiende peticiones: como mucho una vez por intervalo
+            if time.monotonic() - self._ultima_poda >= self.intervalo_poda:
+                self._podar()
+            self._jtis[jti] = exp
+            self._jtis.move_to_end(jti)
+            while len(self._jtis) > self.maximo:
+                self._jtis.popitem(last=False)
+
+    def contiene(self, jti):
+        with self._lock:
+            exp = self._jtis.get(jti)
+            if exp is None:
+                return False
+            if exp < time.time():
+                # Un token expirado ya lo rechaza la validación de exp
+                del self._jtis[jti]
+                return False
+            return True
+
+    def podar(self):
+        with self._lock:
+            self._podar()
+
+    def _podar(self):
+        ahora = time.time()
+        for jti in [jti for jti, exp in self._jtis.items() if exp < ahora]:
+            del self._jtis[jti]
+        self._ultima_poda = time.monotonic()
+
+    def limpiar(self):
+        with self._lock:
+            self._jtis.clear()
+
+
+revocados = JTIsRevocados()
+
+
+class RefreshTokenConCache(RefreshToken):
+    # Evita las consultas al modelo de usuario de simplejwt y consulta
+    # primero la caché local de revocados
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if revocados.contiene(jti):
+            raise TokenError(_('Token is blacklisted'))
+        if BlacklistedToken.objects.filter(token__jti=jti).exists():
+            revocados.agregar(jti, self.payload['exp'])
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        exp = self.payload['exp']
+        token, _creado = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+                'created_at': self.current_time,
+                'token': str(self),
+                'expires_at': datetime_from_epoch(exp),
+            },
+        )
+        resultado = BlacklistedToken.objects.get_or_create(token=token)
+        revocados.agregar(jti, exp)
+        return resultado
+
+    def outstand(self):
+        # El jti recién generado es único: no hace falta get_or_create
+        return OutstandingToken.objects.create(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+            created_at=self.current_time,
+            token=str(self),
+            expires_at=datetime_from_epoch(self.payload['exp']),
+        )
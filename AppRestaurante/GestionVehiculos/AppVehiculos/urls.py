@@ -2,11 +2,18 @@ from django.urls import path
 from .views import (
     CustomTokenObtainPairView,
     EmpleadoAPIView,
+    MenuAPIView,
+    MetricasAPIView,
+    PedidoAPIView,
+    PedidoDetailAPIView,
     ProductoAPIView,
+    ProductoBulkAPIView,
+    ProductoBusquedaAPIView,
     PromocionAPIView,
     PromocionDetailAPIView,
 )
 from rest_framework_simplejwt.views import TokenRefreshView
+from . import async_views, streams
 
 urlpatterns = [
     path('auth/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -14,6 +21,17 @@ urlpatterns = [
     path('empleados/', EmpleadoAPIView.as_view(), name='empleado-list'),
     path('productos/', ProductoAPIView.as_view(), name='producto-list'),
     path('productos/<int:pk>/', ProductoAPIView.as_view(), name='producto-detail'),
+    path('productos/bulk/', ProductoBulkAPIView.as_view(), name='producto-bulk'),
+    path('productos/search/', ProductoBusquedaAPIView.as_view(), name='producto-search'),
     path('promociones/', PromocionAPIView.as_view(), name='promocion-list'),
     path('promociones/<int:pk>/', PromocionDetailAPIView.as_view(), name='promocion-detail'),
+    path('menu/', MenuAPIView.as_view(), name='menu'),
+    path('pedidos/', PedidoAPIView.as_view(), name='pedido-list'),
+    path('pedidos/<int:pk>/', PedidoDetailAPIView.as_view(), name='pedido-detail'),
+    path('async/productos/', async_views.productos, name='async-producto-list'),
+    path('async/productos/<int:pk>/', async_views.productos, name='async-producto-detail'),
+    path('async/promociones/', async_views.promociones, name='async-promocion-list'),
+    path('async/promociones/<int:pk>/', async_views.promociones, name='async-promocion-detail'),
+    path('eventos/menu/', streams.eventos_menu, name='eventos-menu'),
+    path('metricas/', MetricasAPIView.as_view(), name='metricas'),
 ]
\ No newline at end of file
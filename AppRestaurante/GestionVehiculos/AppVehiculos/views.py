@@ -3,11 +3,42 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.shortcuts import get_object_or_404
-from .models import Empleado, Producto, Promocion
-from .serializers import EmpleadoSerializer, ProductoSerializer, CustomTokenObtainPairSerializer, PromocionSerializer
+from django.http import Http404
+from django.db.models import Prefetch, ProtectedError
+from .models import Empleado, LineaPedido, Pedido, PrecioVigente, Producto, Promocion, lotes_de_ids
+from .serializers import (
+    EmpleadoSerializer, ProductoSerializer, CustomTokenObtainPairSerializer, PromocionSerializer,
+    PrecioVigenteSerializer, PedidoSerializer, PedidoEstadoSerializer,
+    CAMPOS_PRODUCTO, CAMPOS_PROMOCION, productos_a_datos, promociones_a_datos,
+)
+from rest_framework.permissions import IsAuthenticated
 from .permissions import IsAdmin, IsAdminOrMeseroOrReadOnly  # Importación corregida
+from .pagination import CursorPaginacionOpcional
+from .cache import datos_en_cache
+from .routers import lectura_en_replica, primaria_fijada
+from .pricing import asegurar_precios_vigentes, calcular_precios
+from .search import buscar_productos
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
 from rest_framework import generics
 from rest_framework.exceptions import PermissionDenied
+from django.db import transaction
+from collections import Counter
+from .signals import notificar_cambio_menu
+from .metrics import metricas
+from .streams import respuesta_json_en_streaming
+from django.http import HttpResponse
+
+class LecturaEnReplicaMixin:
+    # Sus GET no escriben: pueden leerse de una réplica (ver routers.py)
+    lectura_en_replica = True
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Ya autenticado: si este empleado acaba de escribir, lee de la primaria
+        if lectura_en_replica.get() and primaria_fijada(request.user):
+            lectura_en_replica.set(False)
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
@@ -26,18 +57,37 @@ class EmpleadoAPIView(APIView):
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ProductoAPIView(APIView):
+class ProductoAPIView(LecturaEnReplicaMixin, APIView):
     permission_classes = [IsAdminOrMeseroOrReadOnly]  # Permiso actualizado
+    pagination_class = CursorPaginacionOpcional
+    filtros = ('categoria', 'estado')
+
+    def get_queryset(self):
+        productos = Producto.objects.order_by('id')
+        for campo in self.filtros:
+            valor = self.request.query_params.get(campo)
+            if valor:
+                productos = productos.filter(**{campo: valor})
+        return productos
 
     def get(self, request, pk=None):
+        if pk is None and pedir_streaming(request, self.pagination_class()):
+            return respuesta_json_en_streaming(request, self.get_queryset().values(*CAMPOS_PRODUCTO), productos_a_datos)
+        return Response(datos_en_cache('productos', request, lambda: self.leer(request, pk)))
+
+    def leer(self, request, pk=None):
         if pk:
             producto = get_object_or_404(Producto, pk=pk)
             serializer = ProductoSerializer(producto)
-            return Response(serializer.data)
+            return serializer.data
         
-        productos = Producto.objects.all()
-        serializer = ProductoSerializer(productos, many=True)
-        return Response(serializer.data)
+        # Listado por la ruta rápida: filas de .values(), misma salida que ProductoSerializer
+        productos = self.get_queryset().values(*CAMPOS_PRODUCTO)
+        paginator = self.pagination_class()
+        pagina = paginator.paginate_queryset(productos, request, view=self)
+        if pagina is not None:
+            return paginator.get_paginated_response(productos_a_datos(pagina)).data
+        return productos_a_datos(productos)
 
     def post(self, request):
         serializer = ProductoSerializer(data=request.data)
@@ -54,35 +104,219 @@ class ProductoAPIView(APIView):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def patch(self, request, pk):
-        producto = get_object_or_404(Producto, pk=pk)
-        
+    def patch(self, request, pk=None):
+        if pk is None:
+            return self.patch_categoria(request)
+
         if 'estado' in request.data and request.data['estado'] == 'toggle':
-            nuevo_estado = 'FUERA_STOCK' if producto.estado == 'DISPONIBLE' else 'DISPONIBLE'
-            producto.estado = nuevo_estado
-            producto.save()
+            # UPDATE condicional en una sola sentencia: sin carreras entre meseros
+            with transaction.atomic():
+                productos = Producto.objects.filter(pk=pk)
+                if not productos.alternar_estado():
+                    raise Http404
+                nuevo_estado = productos.values_list('estado', flat=True).get()
+                notificar_cambio_menu(Producto, [pk])
             return Response({
                 'status': 'success',
                 'message': f'Estado cambiado a {nuevo_estado}',
-                'nuevo_estado': producto.get_estado_display(),
-                'producto_id': producto.id
+                'nuevo_estado': dict(Producto.ESTADO_CHOICES)[nuevo_estado],
+                'producto_id': pk
             })
         
+        producto = get_object_or_404(Producto, pk=pk)
         serializer = ProductoSerializer(producto, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def patch_categoria(self, request):
+        categoria = request.query_params.get('categoria') or request.data.get('categoria')
+        estado = request.data.get('estado')
+        if categoria not in dict(Producto.CATEGORIA_CHOICES):
+            return Response({'categoria': ['Categoría inválida.']}, status=status.HTTP_400_BAD_REQUEST)
+        if estado != 'toggle' and estado not in dict(Producto.ESTADO_CHOICES):
+            return Response({'estado': ['Use "toggle" o un estado válido.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            productos = Producto.objects.filter(categoria=categoria)
+            ids = list(productos.values_list('id', flat=True))
+            if estado == 'toggle':
+                actualizados = productos.alternar_estado()
+            else:
+                actualizados = productos.update(estado=estado)
+            if ids:
+                notificar_cambio_menu(Producto, ids)
+        return Response({
+            'status': 'success',
+            'categoria': categoria,
+            'actualizados': actualizados,
+        })
+
     def delete(self, request, pk):
         producto = get_object_or_404(Producto, pk=pk)
-        producto.delete()
+        try:
+            producto.delete()
+        except ProtectedError:
+            # Las líneas de pedido conservan el producto: se puede marcar fuera de stock
+            return Response(
+                {'detail': 'El producto figura en pedidos y no se puede eliminar; márquelo como FUERA_STOCK.'},
+                status=status.HTTP_409_CONFLICT
+            )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class PromocionAPIView(generics.ListCreateAPIView):
-    queryset = Promocion.objects.all()
+class ProductoBusquedaAPIView(APIView):
+    # Autocompletado: ?q=<texto>&limite=<n>
+    permission_classes = [IsAdminOrMeseroOrReadOnly]
+    limite_maximo = 50
+
+    def get(self, request):
+        texto = request.query_params.get('q', '')
+        try:
+            limite = int(request.query_params.get('limite', 20))
+        except ValueError:
+            return Response({'detail': 'limite debe ser un número entero.'}, status=status.HTTP_400_BAD_REQUEST)
+        # LIMIT negativo en SQLite significa "sin límite": se acota a [1, limite_maximo]
+        limite = max(1, min(limite, self.limite_maximo))
+        return Response(datos_en_cache(
+            'busqueda', request,
+            lambda: ProductoSerializer(buscar_productos(texto, limite), many=True).data
+        ))
+
+class ProductoBulkAPIView(APIView):
+    permission_classes = [IsAdminOrMeseroOrReadOnly]
+    max_operaciones = 10000
+    operaciones_validas = ('create', 'update', 'toggle')
+
+    def post(self, request):
+        operaciones = request.data
+        if not isinstance(operaciones, list):
+            return Response({'detail': 'Se esperaba una lista de operaciones.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operaciones) > self.max_operaciones:
+            return Response(
+                {'detail': f'Máximo {self.max_operaciones} operaciones por petición.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        errores = {}
+        grupos = {op: [] for op in self.operaciones_validas}
+        for indice, operacion in enumerate(operaciones):
+            tipo = operacion.get('op') if isinstance(operacion, dict) else None
+            if tipo not in grupos:
+                errores[indice] = {'op': [f'Debe ser una de: {", ".join(self.operaciones_validas)}.']}
+                continue
+            datos = {k: v for k, v in operacion.items() if k != 'op'}
+            if tipo != 'create':
+                try:
+                    datos['id'] = int(datos.get('id'))
+                except (TypeError, ValueError):
+                    errores[indice] = {'id': ['Id de producto inválido.']}
+                    continue
+            grupos[tipo].append((indice, datos))
+
+        # Una sola consulta para todas las instancias a actualizar o alternar
+        ids = {datos['id'] for tipo in ('update', 'toggle') for _, datos in grupos[tipo]}
+        existentes = Producto.objects.in_bulk(ids)
+
+        creacion = ProductoSerializer(data=[datos for _, datos in grupos['create']], many=True)
+        actualizacion = ProductoSerializer(
+            existentes, data=[datos for _, datos in grupos['update']], many=True, partial=True
+        )
+        for serializer, tipo in ((creacion, 'create'), (actualizacion, 'update')):
+            if not serializer.is_valid():
+                # Según la versión de DRF los errores llegan como lista o como dict por posición
+                por_posicion = serializer.errors
+                if not isinstance(por_posicion, dict):
+                    por_posicion = dict(enumerate(por_posicion))
+                for posicion, error in por_posicion.items():
+                    if error:
+                        errores[grupos[tipo][posicion][0]] = error
+        for indice, datos in grupos['toggle']:
+            if datos['id'] not in existentes:
+                errores[indice] = {'id': ['Producto no encontrado.']}
+
+        if errores:
+            return Response(
+                {'errores': [{'indice': indice, 'errores': errores[indice]} for indice in sorted(errores)]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Alternar dos veces el mismo producto lo deja igual
+        veces = Counter(datos['id'] for _, datos in grupos['toggle'])
+        alternar = [producto_id for producto_id, n in veces.items() if n % 2]
+
+        with transaction.atomic():
+            creados = creacion.save() if grupos['create'] else []
+            if grupos['update']:
+                actualizacion.save()
+            for lote in lotes_de_ids(alternar):
+                Producto.objects.filter(id__in=lote).alternar_estado()
+
+            # bulk_create/bulk_update no disparan post_save
+            creados_ids = [producto.pk for producto in creados]
+            # Un mismo id puede venir repetido en el lote: cuenta una sola fila
+            actualizados = {datos['id'] for _, datos in grupos['update']}
+            modificados = actualizados | set(alternar)
+            if creados_ids:
+                notificar_cambio_menu(Producto, creados_ids, 'creado')
+            if modificados:
+                notificar_cambio_menu(Producto, modificados)
+
+        return Response({
+            'creados': creados_ids,
+            'actualizados': len(actualizados),
+            'alternados': len(alternar),
+        }, status=status.HTTP_200_OK)
+
+def pedir_streaming(request, paginator):
+    # ?stream=1 solo aplica a listados completos; con cursor/page_size manda la paginación
+    return request.query_params.get('stream') in ('1', 'true') and not paginator.solicitada(request)
+
+def promociones_con_productos():
+    # Una sola consulta extra para los ids de productos de todas las promociones
+    return Promocion.objects.prefetch_related(
+        Prefetch('productos', queryset=Producto.objects.only('id').order_by('id'))
+    ).order_by('id')
+
+class PromocionAPIView(LecturaEnReplicaMixin, generics.ListCreateAPIView):
     serializer_class = PromocionSerializer
     permission_classes = [IsAdminOrMeseroOrReadOnly]
+    pagination_class = CursorPaginacionOpcional
+
+    def get_queryset(self):
+        promociones = promociones_con_productos()
+        activa = self.request.query_params.get('activa')
+        if activa is None:
+            return promociones
+        fecha = timezone.now().date()
+        if 'fecha' in self.request.query_params:
+            fecha = parse_date(self.request.query_params['fecha'])
+            if fecha is None:
+                raise ValidationError({'fecha': 'Formato de fecha inválido, use AAAA-MM-DD.'})
+        # ?activa=1[&fecha=AAAA-MM-DD] usa el índice (estado, fecha_inicio, fecha_fin)
+        if activa.lower() in ('1', 'true'):
+            return promociones.activas(fecha)
+        if activa.lower() in ('0', 'false'):
+            return promociones.no_activas(fecha)
+        raise ValidationError({'activa': 'Use 1/true o 0/false.'})
+
+    def list(self, request, *args, **kwargs):
+        if pedir_streaming(request, self.paginator):
+            promociones = self.get_queryset().prefetch_related(None).values(*CAMPOS_PROMOCION)
+            return respuesta_json_en_streaming(request, promociones, lambda lote: promociones_a_datos(lote, request))
+        prefijo = 'promociones'
+        if 'activa' in request.query_params:
+            # ?activa= depende del día: la entrada no debe sobrevivir al cambio de fecha
+            prefijo = f'promociones:{timezone.now().date()}'
+        return Response(datos_en_cache(prefijo, request, lambda: self.leer(request)))
+
+    def leer(self, request):
+        # Misma salida que PromocionSerializer sin instanciar modelos
+        promociones = self.get_queryset().prefetch_related(None).values(*CAMPOS_PROMOCION)
+        pagina = self.paginate_queryset(promociones)
+        if pagina is not None:
+            return self.get_paginated_response(promociones_a_datos(pagina, request)).data
+        return promociones_a_datos(promociones, request)
 
     def perform_create(self, serializer):
         if self.request.user.is_admin():
@@ -90,11 +324,17 @@ class PromocionAPIView(generics.ListCreateAPIView):
         else:
             raise PermissionDenied("Solo los administradores pueden crear promociones")
 
-class PromocionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Promocion.objects.all()
+class PromocionDetailAPIView(LecturaEnReplicaMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PromocionSerializer
     permission_classes = [IsAdminOrMeseroOrReadOnly]
 
+    def get_queryset(self):
+        return promociones_con_productos()
+
+    def retrieve(self, request, *args, **kwargs):
+        obtener = super().retrieve
+        return Response(datos_en_cache('promociones', request, lambda: obtener(request, *args, **kwargs).data))
+
     def perform_update(self, serializer):
         if self.request.user.is_admin():
             serializer.save()
@@ -105,4 +345,65 @@ class PromocionDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         if self.request.user.is_admin():
             instance.delete()
         else:
-            raise PermissionDenied("Solo los administradores pueden eliminar promociones")
\ No newline at end of file
+            raise PermissionDenied("Solo los administradores pueden eliminar promociones")
+
+class MenuAPIView(APIView):
+    permission_classes = [IsAdminOrMeseroOrReadOnly]
+
+    def get(self, request):
+        hoy = timezone.now().date()
+        fecha = hoy
+        if 'fecha' in request.query_params:
+            fecha = parse_date(request.query_params['fecha'])
+            if fecha is None:
+                raise ValidationError({'fecha': 'Formato de fecha inválido, use AAAA-MM-DD.'})
+        return Response(datos_en_cache(f'menu:{hoy}', request, lambda: self.leer(fecha, hoy)))
+
+    def leer(self, fecha, hoy):
+        if fecha != hoy:
+            # Fechas distintas de hoy no están materializadas: se calculan al vuelo
+            precios = calcular_precios(fecha)
+        else:
+            asegurar_precios_vigentes(hoy)
+            precios = PrecioVigente.objects.select_related('producto').order_by('producto_id')
+        return PrecioVigenteSerializer(precios, many=True).data
+
+
+class PedidoAPIView(generics.ListCreateAPIView):
+    # GET es la cola de cocina: ?estado=PENDIENTE,EN_PREPARACION en orden de llegada
+    serializer_class = PedidoSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CursorPaginacionOpcional
+    estados_cocina = 'PENDIENTE,EN_PREPARACION'
+
+    def get_queryset(self):
+        estados = self.request.query_params.get('estado', self.estados_cocina).split(',')
+        return Pedido.objects.filter(estado__in=estados).order_by('id').prefetch_related(
+            Prefetch('lineas', queryset=LineaPedido.objects.select_related('producto').order_by('id'))
+        )
+
+    def perform_create(self, serializer):
+        serializer.save(mesero_id=self.request.user.id)
+
+class PedidoDetailAPIView(generics.RetrieveUpdateAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return Pedido.objects.prefetch_related(
+                Prefetch('lineas', queryset=LineaPedido.objects.select_related('producto').order_by('id'))
+            )
+        return Pedido.objects.all()
+
+    def get_serializer_class(self):
+        # Solo el estado se modifica una vez creado el pedido
+        if self.request.method == 'GET':
+            return PedidoSerializer
+        return PedidoEstadoSerializer
+
+
+class MetricasAPIView(APIView):
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return HttpResponse(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
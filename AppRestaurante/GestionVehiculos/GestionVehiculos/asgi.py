@@ -3,6 +3,14 @@ ASGI config for GestionVehiculos project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Las lecturas bajo /api/async/ son vistas asíncronas nativas (ORM asíncrono),
+por lo que conviene servir este módulo con un servidor ASGI, por ejemplo:
+
+    uvicorn GestionVehiculos.asgi:application --workers 4
+    gunicorn GestionVehiculos.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+Comparativa frente a WSGI: ``python manage.py benchmark_asgi``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
@@ -17,11 +18,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'AppVehiculos',
 ]
 
 MIDDLEWARE = [
+    'AppVehiculos.middleware.MetricasMiddleware',
+    'AppVehiculos.middleware.ReplicaLecturaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -52,12 +56,111 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'GestionVehiculos.wsgi.application'
 
-DATABASES = {
+# Base de datos según el entorno: con DB_NAME (o DB_ENGINE=postgresql) se usa
+# PostgreSQL como describe el README; si no, SQLite local.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'postgresql' if os.environ.get('DB_NAME') else 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'postgres'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Conexiones persistentes entre peticiones, verificadas antes de reutilizarlas
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL') == '1':
+        # Pool de psycopg 3 (Django >= 5.1); es incompatible con CONN_MAX_AGE
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME_SQLITE', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+            'OPTIONS': {
+                'timeout': int(os.environ.get('DB_SQLITE_TIMEOUT', 20)),
+            },
+            # Base de tests en fichero y no en memoria: los tests con hilos necesitan
+            # que los escritores esperen al bloqueo y la réplica de tests se copia de él
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+    if os.environ.get('DB_SQLITE_TUNED') == '1':
+        # Perfil para instalaciones de un solo nodo: lectores concurrentes con WAL,
+        # escrituras que toman el bloqueo al empezar la transacción y fsync reducido
+        DATABASES['default']['OPTIONS'].update({
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA temp_store=MEMORY;'
+                'PRAGMA cache_size=-20000;'
+            ),
+        })
+
+# Réplicas de solo lectura: DB_REPLICAS=host1,host2:5433 en PostgreSQL o rutas de
+# ficheros en SQLite. Las usan los GET de productos y promociones (AppVehiculos/routers.py);
+# en los tests son espejos de la primaria.
+BASES_LECTURA = []
+for numero, replica in enumerate(
+    [valor.strip() for valor in os.environ.get('DB_REPLICAS', '').split(',') if valor.strip()], start=1
+):
+    alias = f'replica{numero}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE == 'postgresql':
+        host, _, puerto = replica.partition(':')
+        DATABASES[alias].update(HOST=host, PORT=puerto or DATABASES['default']['PORT'])
+    else:
+        DATABASES[alias]['NAME'] = replica
+    BASES_LECTURA.append(alias)
+
+DATABASE_ROUTERS = ['AppVehiculos.routers.RouterReplicas']
+# Segundos que un cliente lee de la primaria después de escribir
+REPLICA_STICKY_SEGUNDOS = int(os.environ.get('DB_REPLICA_STICKY', 5))
+
+# Caché del menú: memoria local por defecto, configurable por entorno (p.ej. Redis)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'menu-restaurante'),
     }
 }
+MENU_CACHE_ALIAS = os.environ.get('MENU_CACHE_ALIAS', 'default')
+MENU_CACHE_TIMEOUT = int(os.environ.get('MENU_CACHE_TIMEOUT', 300))
+
+# Snapshot estático del menú (menu.json, .gz y manifest.json) para servir sin Django;
+# con MENU_SNAPSHOT_DIR vacío solo se publica con `manage.py publicar_menu --directorio`
+MENU_SNAPSHOT_DIR = os.environ.get('MENU_SNAPSHOT_DIR') or None
+MENU_SNAPSHOT_CONSERVAR = 5
+MENU_SNAPSHOT_SINCRONO = False
+
+# Listados completos con ?stream=1: filas por lote y gzip si el cliente lo acepta
+STREAM_CHUNK_SIZE = 2000
+STREAM_GZIP = True
+
+# Cabecera Server-Timing con SQL y tiempo del manejador (los histogramas de /api/metricas/ siempre se recogen)
+METRICAS_SERVER_TIMING = os.environ.get('METRICAS_SERVER_TIMING', '1') == '1'
+
+# Stream SSE de cambios del menú (/api/eventos/menu/), servido desde ASGI
+SSE_INTERVALO = 1
+SSE_INTERVALO_MAXIMO = 15
+SSE_DURACION_MAXIMA = 300
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -72,17 +175,42 @@ USE_I18N = True
 USE_TZ = True
 
 STATIC_URL = 'static/'
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+
+# Versiones reducidas de las imágenes de promociones, generadas fuera de la petición
+IMAGENES_WORKERS = int(os.environ.get('IMAGENES_WORKERS', 2))
+IMAGENES_CALIDAD = 80
+IMAGENES_SINCRONO = False
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'AppVehiculos.Empleado'
 
+# JWT_STATELESS=0 vuelve a cargar el Empleado desde la BD en cada petición
+JWT_STATELESS = os.environ.get('JWT_STATELESS', '1') == '1'
+# Segundos que se guarda el Empleado completo para request.user.empleado (0 = sin caché)
+EMPLEADO_CACHE_TIMEOUT = int(os.environ.get('EMPLEADO_CACHE_TIMEOUT', 60))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'AppVehiculos.authentication.EmpleadoTokenAuthentication' if JWT_STATELESS
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # JSON con orjson y MessagePack (Accept: application/msgpack) si el paquete está instalado
+    'DEFAULT_RENDERER_CLASSES': [
+        'AppVehiculos.renderers.ORJSONRenderer',
+        *(['AppVehiculos.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'AppVehiculos.renderers.ORJSONParser',
+        *(['AppVehiculos.renderers.MessagePackParser'] if find_spec('msgpack') else []),
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -96,6 +224,8 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'TOKEN_OBTAIN_SERIALIZER': 'AppVehiculos.serializers.CustomTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'AppVehiculos.serializers.TokenRefreshConCacheSerializer',
+    'TOKEN_USER_CLASS': 'AppVehiculos.authentication.EmpleadoToken',
 }
 
 AUTH_USER_MODEL = 'AppVehiculos.Empleado'